@@ -9,6 +9,13 @@ import socket
 
 KOMODO_VERSION = "0.3.0"
 
+ENHANCED_UNSUPPORTED = (
+    "stream", "max_inflight_mb", "executor", "two_phase", "cache_dir", "cache_max_mb",
+    "incremental", "from_git_index", "include_untracked", "git_ref", "paths_from", "since",
+    "diff", "hunks", "token_threads", "fit_by_bytes", "estimate_tokens", "tokenizer_path",
+    "word_count_fallback",
+)
+
 def run_server():
     try: 
         def is_port_available(port):
@@ -48,19 +55,40 @@ def run_server():
         print(f" Failed to start server")
         sys.exit(1)
 
+def read_path_list(stream, block_size=64 * 1024):
+    separator = None
+    pending = b""
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        pending += block
+        if separator is None:
+            separator = b"\0" if b"\0" in pending else b"\n"
+        *names, pending = pending.split(separator)
+        for name in names:
+            if separator == b"\n":
+                name = name.rstrip(b"\r")
+            if name:
+                yield os.fsdecode(name)
+    if separator == b"\n":
+        pending = pending.rstrip(b"\r")
+    if pending:
+        yield os.fsdecode(pending)
+
 def main():
     parser = argparse.ArgumentParser(
         description="Process and chunk codebase",
-        epilog="Examples:\n  komodo . --max-chunk-size 2000\n  komodo run",
+        epilog="Examples:\n  komodo . --max-chunk-size 2000\n  komodo run\n  komodo watch src --max-chunk-size 2000\n  komodo repo.git --git-ref v1.2.0 --max-chunk-size 2000\n  komodo . --diff main..HEAD --hunks --max-chunk-size 2000\n  git ls-files -z | komodo --paths-from - --max-chunk-size 2000",
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
 
     parser.add_argument("--version", action="version", version=f"komodo {KOMODO_VERSION}")
     
     parser.add_argument("command", nargs="?", 
-                        help="run: Launch web interface")
+                        help="run: Launch web interface; watch: Keep chunks up to date as files change")
 
-    parser.add_argument("dirs", nargs="*", default=["."],
+    parser.add_argument("dirs", nargs="*", default=[],
                         help="Directories to process")
     
     chunk_group = parser.add_mutually_exclusive_group(required=False)
@@ -88,6 +116,21 @@ def main():
     parser.add_argument("--num-threads", type=int, default=4,
                         help="Number of processing threads")
 
+    parser.add_argument("--token-threads", type=int, default=None,
+                        help="Threads used to count tokens with --max-tokens (default: --num-threads)")
+    parser.add_argument("--fit-by-bytes", action="store_true",
+                        help="With --max-tokens, write files whose UTF-8 size in bytes is within the limit "
+                             "as single chunks without tokenizing them")
+    parser.add_argument("--estimate-tokens", action="store_true",
+                        help="With --equal-chunks and --max-tokens, balance chunks on estimated "
+                             "instead of exact token counts")
+    parser.add_argument("--tokenizer-path", default=None,
+                        help="Local tiktoken rank file, or a directory holding one or a tiktoken cache, "
+                             "for --max-tokens without network access")
+    parser.add_argument("--word-count-fallback", action="store_true",
+                        help="With --max-tokens, count whitespace-separated words if the tokenizer "
+                             "cannot be loaded instead of failing")
+
     parser.add_argument("--enhanced", action="store_true",
                         help="Enable LLM optimizations")
     
@@ -105,6 +148,47 @@ def main():
     parser.add_argument("--no-summaries", action="store_true",
                         help="Disable summary generation")
 
+    parser.add_argument("--stream", action="store_true",
+                        help="Write chunks as files finish loading instead of in priority order")
+
+    parser.add_argument("--max-inflight-mb", type=int, default=256,
+                        help="Cap on file contents held in memory at once, in MB (default: 256)")
+
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="Run per-file decoding and chunk planning in threads or worker processes (default: thread)")
+
+    parser.add_argument("--two-phase", action="store_true",
+                        help="Plan chunks for all files in parallel, then write them concurrently")
+
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directory for the on-disk decode/redaction and token-count caches (default: disabled)")
+    parser.add_argument("--cache-max-mb", type=int, default=512,
+                        help="Total size cap for the on-disk caches, in MB; with --max-tokens it is split "
+                             "evenly between the redaction and token-count caches (default: 512)")
+
+    parser.add_argument("--incremental", action="store_true",
+                        help="Keep a manifest in the output directory and only re-chunk files that changed")
+    parser.add_argument("--from-git-index", action="store_true",
+                        help="List files from .git/index instead of walking the directories")
+    parser.add_argument("--include-untracked", action="store_true",
+                        help="With --from-git-index, also walk for untracked files that are not ignored")
+    parser.add_argument("--git-ref", default=None,
+                        help="Chunk the files at this commit, tag or branch of the given repository without checking it out")
+    parser.add_argument("--paths-from", default=None, metavar="FILE",
+                        help="Chunk the files listed in FILE ('-' for stdin), one per line or NUL-separated, instead of walking directories")
+    parser.add_argument("--since", default=None, metavar="REV",
+                        help="Only chunk tracked files that changed between REV and the working tree")
+    parser.add_argument("--diff", default=None, metavar="A..B",
+                        help="Only chunk files changed between two revisions, read from B without checking it out")
+    parser.add_argument("--hunks", action="store_true",
+                        help="With --since/--diff, chunk only the changed hunks instead of whole files")
+    parser.add_argument("--hunk-context", type=int, default=3,
+                        help="With --hunks, unchanged lines kept around each hunk (default: 3)")
+    parser.add_argument("--debounce", type=float, default=0.5,
+                        help="watch: seconds to wait for a burst of changes to settle (default: 0.5)")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="watch: seconds between checks when inotify is unavailable (default: 1.0)")
+
     parser.add_argument("--file-type", type=str, 
                         help="Only chunk files of this type (e.g., 'pdf', 'py')")
                         
@@ -124,6 +208,32 @@ def main():
         run_server()
         return
 
+    dirs = args.dirs
+    if args.command not in (None, "watch"):
+        dirs = [args.command] + dirs
+    if not dirs:
+        dirs = ["."]
+
+    sources = [flag for flag, value in (("--git-ref", args.git_ref), ("--since", args.since),
+                                        ("--diff", args.diff), ("--paths-from", args.paths_from)) if value]
+    if len(sources) > 1:
+        parser.error(f"{' and '.join(sources)} cannot be combined")
+    if sources and (args.command == "watch" or len(dirs) != 1):
+        parser.error(f"{sources[0]} takes exactly one directory and cannot be used with 'watch'")
+    if args.hunks and not (args.since or args.diff):
+        parser.error("--hunks requires --since or --diff")
+    if args.fit_by_bytes and not args.max_tokens:
+        parser.error("--fit-by-bytes requires --max-tokens")
+    if args.estimate_tokens and not (args.max_tokens and args.equal_chunks):
+        parser.error("--estimate-tokens requires --equal-chunks and --max-tokens")
+    if args.enhanced:
+        unsupported = ["--" + dest.replace("_", "-") for dest in ENHANCED_UNSUPPORTED
+                       if getattr(args, dest) != parser.get_default(dest)]
+        if args.command == "watch":
+            unsupported.insert(0, "'watch'")
+        if unsupported:
+            parser.error(f"--enhanced cannot be combined with {', '.join(unsupported)}")
+
     if not any([args.equal_chunks, args.max_chunk_size, args.max_tokens]):
         parser.error("One of --equal-chunks, --max-chunk-size, or --max-tokens is required (unless using 'run')")
 
@@ -165,7 +275,23 @@ def main():
                 "dry_run": args.dry_run,
                 "semantic_chunking": args.semantic_chunks,
                 "file_type": args.file_type,
-                "verbose": args.verbose
+                "verbose": args.verbose,
+                "stream": args.stream,
+                "max_inflight_bytes": args.max_inflight_mb * 1024 * 1024,
+                "executor": args.executor,
+                "two_phase": args.two_phase,
+                "transform_cache_dir": args.cache_dir,
+                "transform_cache_max_bytes": args.cache_max_mb * 1024 * 1024 // 2,
+                "incremental": args.incremental,
+                "from_git_index": args.from_git_index,
+                "git_untracked": args.include_untracked,
+                "token_threads": args.token_threads,
+                "token_cache_dir": args.cache_dir,
+                "token_cache_max_bytes": args.cache_max_mb * 1024 * 1024 // 2,
+                "tokenizer_path": args.tokenizer_path,
+                "estimate_tokens": args.estimate_tokens,
+                "fit_by_bytes": args.fit_by_bytes,
+                "word_count_fallback": args.word_count_fallback
             }
         else:
             if args.enhanced:
@@ -186,13 +312,6 @@ def main():
                 "file_type": args.file_type
             }
 
-            if not args.enhanced:
-                chunker_args.update({
-                    "export_jsonl": args.export_jsonl,
-                    "export_path": args.export_path,
-                    "export_embed_model": args.export_embed_model,
-                })
-            
             if args.enhanced:
                 chunker_args.update({
                     "extract_metadata": not args.no_metadata,
@@ -201,6 +320,21 @@ def main():
                     "context_window": args.context_window,
                     "min_relevance_score": args.min_relevance
                 })
+            else:
+                chunker_args.update({
+                    "export_jsonl": args.export_jsonl,
+                    "export_path": args.export_path,
+                    "export_embed_model": args.export_embed_model,
+                    "stream": args.stream,
+                    "max_inflight_bytes": args.max_inflight_mb * 1024 * 1024,
+                    "executor": args.executor,
+                    "two_phase": args.two_phase,
+                    "transform_cache_dir": args.cache_dir,
+                    "transform_cache_max_bytes": args.cache_max_mb * 1024 * 1024,
+                    "incremental": args.incremental,
+                    "from_git_index": args.from_git_index,
+                    "git_untracked": args.include_untracked,
+                })
     
         chunker = ChunkerClass(**chunker_args)
 
@@ -209,10 +343,27 @@ def main():
 
         print("Directory tree structure will be automatically included")
         
-        chunker.process_directories(args.dirs)
+        if args.command == "watch":
+            print(f"Watching {', '.join(dirs)} for changes (Ctrl+C to stop)")
+            chunker.watch(dirs, debounce=args.debounce, poll_interval=args.poll_interval)
+        elif args.paths_from:
+            if args.paths_from == "-":
+                chunker.process_paths(read_path_list(sys.stdin.buffer), root=dirs[0])
+            else:
+                with open(args.paths_from, "rb") as f:
+                    chunker.process_paths(read_path_list(f), root=dirs[0])
+        elif args.git_ref:
+            chunker.process_git_ref(dirs[0], args.git_ref)
+        elif args.since or args.diff:
+            from pykomodo.git_objects import resolve_range
+            base, head = (args.since, None) if args.since else resolve_range(dirs[0], args.diff)
+            hunk_context = args.hunk_context if args.hunks else None
+            chunker.process_git_diff(dirs[0], base, head, hunk_context=hunk_context)
+        else:
+            chunker.process_directories(dirs)
         
-    except Exception:
-        print(f"[Error] Processing failed")
+    except Exception as e:
+        print(f"[Error] Processing failed: {e}", file=sys.stderr)
         sys.exit(1)
     finally:
         if chunker and hasattr(chunker, 'close'):
@@ -247,7 +247,7 @@ class EnhancedParallelChunker(ParallelChunker):
         content_parts = []
         
         if chunk_num == 0 and self.current_walk_root:
-            tree = self.tree_generator.prepare_tree_header(self.current_walk_root)
+            tree = self._tree_header()
             content_parts.append(tree)
         
         content_parts.append(f"CHUNK {chunk_num}")
@@ -305,7 +305,7 @@ class EnhancedParallelChunker(ParallelChunker):
         try:
             tree_header = ""
             if chunk_num == 0 and hasattr(self, 'current_walk_root') and self.current_walk_root:
-                tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
+                tree_header = self._tree_header()
             
             if isinstance(content_bytes, bytes):
                 content_str = content_bytes.decode('utf-8', errors='replace')
@@ -0,0 +1,120 @@
+import collections
+import os
+import struct
+
+IndexEntry = collections.namedtuple("IndexEntry", "path mode size mtime_ns sha")
+
+ENTRY_STAT = struct.Struct(">10I")
+REGULAR_FILE = 0o100000
+FILE_TYPE_MASK = 0o170000
+DIRECTORY = 0o040000
+FLAG_EXTENDED = 0x4000
+EXT_SKIP_WORKTREE = 0x4000
+
+
+def find_work_tree(path):
+    current = os.path.abspath(path)
+    while True:
+        dot_git = os.path.join(current, ".git")
+        if os.path.isdir(dot_git):
+            return current, dot_git
+        if os.path.isfile(dot_git):
+            try:
+                with open(dot_git, "r", encoding="utf-8") as f:
+                    line = f.readline().strip()
+            except OSError:
+                return None
+            if line.startswith("gitdir:"):
+                git_dir = os.path.join(current, line[len("gitdir:"):].strip())
+                return current, os.path.normpath(git_dir)
+            return None
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def _common_dir(git_dir):
+    try:
+        with open(os.path.join(git_dir, "commondir"), "r", encoding="utf-8") as f:
+            return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    except OSError:
+        return git_dir
+
+
+def _hash_size(git_dir):
+    try:
+        with open(os.path.join(_common_dir(git_dir), "config"), "r", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition("=")
+                if key.strip().lower() == "objectformat" and value.strip().lower() == "sha256":
+                    return 32
+    except OSError:
+        pass
+    return 20
+
+
+def _read_varint(data, pos):
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, pos
+
+
+def read_index(git_dir):
+    with open(os.path.join(git_dir, "index"), "rb") as f:
+        data = f.read()
+    if data[:4] != b"DIRC":
+        raise ValueError("Not a git index file")
+    version, count = struct.unpack_from(">II", data, 4)
+    if version not in (2, 3, 4):
+        raise ValueError(f"Unsupported git index version {version}")
+    hash_size = _hash_size(git_dir)
+
+    entries = []
+    offset = 12
+    previous = b""
+    for _ in range(count):
+        stat = ENTRY_STAT.unpack_from(data, offset)
+        mode, size = stat[6], stat[9]
+        pos = offset + ENTRY_STAT.size
+        sha = data[pos:pos + hash_size].hex()
+        pos += hash_size
+        flags, = struct.unpack_from(">H", data, pos)
+        pos += 2
+        extended = 0
+        if flags & FLAG_EXTENDED:
+            extended, = struct.unpack_from(">H", data, pos)
+            pos += 2
+        if version == 4:
+            strip, pos = _read_varint(data, pos)
+            end = data.index(b"\0", pos)
+            name = previous[:len(previous) - strip] + data[pos:end]
+            offset = end + 1
+        else:
+            end = data.index(b"\0", pos)
+            name = data[pos:end]
+            offset += (end - offset + 8) & ~7
+        previous = name
+
+        if mode & FILE_TYPE_MASK == DIRECTORY:
+            raise ValueError("Sparse git indexes are not supported")
+        if mode & FILE_TYPE_MASK != REGULAR_FILE or extended & EXT_SKIP_WORKTREE:
+            continue
+        path = os.fsdecode(name)
+        if flags & 0x3000 and entries and entries[-1].path == path:
+            continue
+        entries.append(IndexEntry(path, mode, size, stat[2] * 1000000000 + stat[3], sha))
+
+    end = len(data) - hash_size
+    while offset + 8 <= end:
+        signature = data[offset:offset + 4]
+        length, = struct.unpack_from(">I", data, offset + 4)
+        if signature == b"link":
+            raise ValueError("Split git indexes are not supported")
+        offset += 8 + length
+    return entries
@@ -0,0 +1,200 @@
+import codecs
+import collections
+import re
+import subprocess
+import threading
+
+TreeEntry = collections.namedtuple("TreeEntry", "path mode size sha")
+
+BLOB_MODES = ("100644", "100755")
+HUNK_HEADER = re.compile(rb"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def _run_git(repo, *args):
+    try:
+        result = subprocess.run(["git", "-C", repo, *args], capture_output=True)
+    except OSError as e:
+        raise ValueError(f"Could not run git: {e}")
+    if result.returncode != 0:
+        message = result.stderr.decode("utf-8", errors="replace").strip()
+        raise ValueError(message or f"git {args[0]} failed in {repo}")
+    return result.stdout
+
+
+def _check_rev(ref):
+    if not ref or ref.startswith("-"):
+        raise ValueError(f"Invalid git ref: {ref!r}")
+
+
+def resolve_tree(repo, ref):
+    _check_rev(ref)
+    try:
+        out = _run_git(repo, "rev-parse", "--verify", f"{ref}^{{tree}}")
+    except ValueError as e:
+        raise ValueError(f"Cannot resolve git ref {ref!r} in {repo}: {e}")
+    return out.decode("ascii").strip()
+
+
+def list_tree(repo, ref):
+    tree = resolve_tree(repo, ref)
+    entries = []
+    for record in _run_git(repo, "ls-tree", "-r", "-l", "-z", tree).split(b"\0"):
+        if not record:
+            continue
+        meta, _, name = record.partition(b"\t")
+        mode, kind, sha, size = meta.decode("ascii").split()
+        if kind != "blob":
+            continue
+        entries.append(TreeEntry(name.decode("utf-8", errors="surrogateescape"), mode,
+                                 int(size) if size != "-" else 0, sha))
+    return entries
+
+
+def resolve_range(repo, spec):
+    if "..." in spec:
+        left, _, right = spec.partition("...")
+        left, right = left or "HEAD", right or "HEAD"
+        _check_rev(left)
+        _check_rev(right)
+        base = _run_git(repo, "merge-base", left, right).decode("ascii").strip()
+        return base, right
+    left, sep, right = spec.partition("..")
+    if not sep:
+        raise ValueError(f"Expected a revision range like A..B, got {spec!r}")
+    return left or "HEAD", right or "HEAD"
+
+
+def _diff_revisions(base, head):
+    revisions = [base] if head is None else [base, head]
+    for rev in revisions:
+        _check_rev(rev)
+    return revisions
+
+
+def _decode_path(name):
+    if name.startswith(b'"') and name.endswith(b'"'):
+        name = codecs.escape_decode(name[1:-1])[0]
+    return name.decode("utf-8", errors="surrogateescape")
+
+
+def changed_paths(repo, base, head=None):
+    out = _run_git(repo, "diff", "--name-only", "-z", "--relative", "--no-renames",
+                   "--diff-filter=d", *_diff_revisions(base, head))
+    return [_decode_path(name) for name in out.split(b"\0") if name]
+
+
+def changed_ranges(repo, base, head=None, context=3):
+    out = _run_git(repo, "-c", "core.quotePath=false", "diff", f"-U{int(context)}",
+                   "--relative", "--no-renames", "--diff-filter=d", "--no-color",
+                   "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/",
+                   *_diff_revisions(base, head))
+    ranges = {}
+    current = None
+    in_header = False
+    for line in out.split(b"\n"):
+        if line.startswith(b"diff --git "):
+            current = None
+            in_header = True
+        elif in_header and line.startswith(b"+++ "):
+            name = line[4:]
+            if name.endswith(b"\t"):
+                name = name[:-1]
+            name = _decode_path(name)
+            current = ranges.setdefault(name[2:], []) if name.startswith("b/") else None
+        elif line.startswith(b"@@"):
+            in_header = False
+            match = HUNK_HEADER.match(line)
+            if current is not None and match:
+                count = int(match.group(2)) if match.group(2) is not None else 1
+                current.append((int(match.group(1)), count))
+    return ranges
+
+
+class CatFileBatch:
+    def __init__(self, repo):
+        self.repo = repo
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._proc is None:
+            try:
+                self._proc = subprocess.Popen(
+                    ["git", "-C", self.repo, "cat-file", "--batch"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+            except OSError as e:
+                raise ValueError(f"Could not run git: {e}")
+        return self._proc
+
+    def _read_reply(self, proc, name):
+        header = proc.stdout.readline()
+        if not header:
+            self.close(kill=True)
+            raise ValueError(f"git cat-file exited while reading {name}")
+        parts = header.split()
+        if len(parts) != 3:
+            return None
+        size = int(parts[2])
+        data = proc.stdout.read(size)
+        proc.stdout.read(1)
+        if len(data) != size:
+            self.close(kill=True)
+            raise ValueError(f"Short read from git cat-file for {name}")
+        return data
+
+    def read(self, name):
+        with self._lock:
+            proc = self._start()
+            proc.stdin.write(name.encode("ascii") + b"\n")
+            proc.stdin.flush()
+            return self._read_reply(proc, name)
+
+    def iter_blobs(self, names):
+        proc = self._start()
+        names = list(names)
+
+        def feed():
+            try:
+                for name in names:
+                    proc.stdin.write(name.encode("ascii") + b"\n")
+                proc.stdin.flush()
+            except (OSError, ValueError):
+                pass
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        finished = False
+        try:
+            for name in names:
+                yield name, self._read_reply(proc, name)
+            finished = True
+        finally:
+            if not finished:
+                self.close(kill=True)
+            feeder.join()
+
+    def close(self, kill=False):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if kill:
+            proc.kill()
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,148 @@
+import hashlib
+import mmap
+import os
+import threading
+
+READ_BLOCK_SIZE = 1024 * 1024
+SNIFF_SIZE = 8192
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+TEXT_EXTENSIONS = frozenset([
+    "txt", "md", "rst", "adoc", "py", "pyi", "pyx", "ipynb",
+    "js", "jsx", "mjs", "cjs", "ts", "tsx", "vue", "svelte",
+    "json", "yaml", "yml", "toml", "ini", "cfg", "conf", "properties",
+    "html", "htm", "css", "scss", "sass", "less", "xml", "svg",
+    "csv", "tsv", "sql", "graphql", "proto",
+    "sh", "bash", "zsh", "fish", "ps1", "bat",
+    "c", "h", "cc", "cpp", "cxx", "hpp", "hh", "m", "mm",
+    "java", "kt", "kts", "scala", "groovy", "gradle", "go", "rs",
+    "rb", "php", "pl", "pm", "lua", "r", "jl", "swift", "dart", "cs",
+    "fs", "ex", "exs", "erl", "hs", "clj", "elm", "tex", "cmake",
+])
+
+
+def looks_binary(block):
+    return b"\0" in block[:SNIFF_SIZE]
+
+
+def _split_segment(segment, terminated):
+    text = segment.decode("utf-8", errors="replace")
+    if terminated:
+        text += "\n"
+    return text.splitlines()
+
+
+def iter_text_lines(path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            buffer = f.read()
+            size = len(buffer)
+        try:
+            start = 0
+            while start < size:
+                end = buffer.find(b"\n", start)
+                if end == -1:
+                    yield from _split_segment(buffer[start:size], False)
+                    break
+                yield from _split_segment(buffer[start:end], True)
+                start = end + 1
+        finally:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+
+
+def read_file(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+def new_content_hash():
+    return hashlib.blake2b(digest_size=16)
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ByteBudget:
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, n):
+        with self._lock:
+            if self.used + n > self.limit:
+                return False
+            self.used += n
+            if self.used > self.peak:
+                self.peak = self.used
+            return True
+
+    def release(self, n):
+        with self._lock:
+            self.used -= n
+
+
+class LoadedFile:
+    __slots__ = ("path", "size", "priority", "content_hash", "source", "_content", "_budget")
+
+    def __init__(self, path, size, priority, content_hash, content=None, budget=None, source=None):
+        self.path = path
+        self.size = size
+        self.priority = priority
+        self.content_hash = content_hash
+        self.source = source
+        self._content = content
+        self._budget = budget if content is not None else None
+
+    @property
+    def content(self):
+        if self._content is not None:
+            return self._content
+        if self.source is not None:
+            return self.source()
+        return read_file(self.path)
+
+    @property
+    def is_resident(self):
+        return self._content is not None
+
+    def release(self):
+        if self._content is None:
+            return
+        self._content = None
+        if self._budget is not None:
+            self._budget.release(self.size)
+            self._budget = None
+
+    def __iter__(self):
+        yield self.path
+        yield self.content
+        yield self.priority
+
+    def __len__(self):
+        return 3
+
+    def __getitem__(self, index):
+        if index in (0, -3):
+            return self.path
+        if index in (1, -2):
+            return self.content
+        if index in (2, -1):
+            return self.priority
+        raise IndexError(index)
+
+    def __repr__(self):
+        return (f"LoadedFile(path={self.path!r}, size={self.size}, "
+                f"priority={self.priority}, content_hash={self.content_hash!r}, "
+                f"resident={self.is_resident})")
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+
+MANIFEST_FILENAME = "komodo-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def config_fingerprint(config):
+    data = json.dumps(config, sort_keys=True, default=repr).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def chunk_path(output_dir, chunk_id):
+    return os.path.join(output_dir, f"chunk-{chunk_id}.txt")
+
+
+class ChunkNumbering:
+    def __init__(self):
+        self.next_id = 0
+
+    def take(self, path):
+        chunk_id = self.next_id
+        self.next_id += 1
+        return chunk_id
+
+    def block_start(self, path):
+        return self.next_id
+
+    def end_block(self, path, stop):
+        self.next_id = stop
+
+
+class IncrementalNumbering(ChunkNumbering):
+    def __init__(self, next_id, free, reusable, zero_pending=False):
+        self.next_id = next_id
+        self.zero_pending = zero_pending
+        self.free = sorted(free, reverse=True)
+        self.reusable = {path: ids[::-1] for path, ids in reusable.items()}
+        self.produced = {}
+
+    def take(self, path):
+        own = self.reusable.get(path)
+        if self.zero_pending:
+            self.zero_pending = False
+            chunk_id = 0
+            if self.next_id == 0:
+                self.next_id = 1
+        elif own:
+            chunk_id = own.pop()
+        elif self.free:
+            chunk_id = self.free.pop()
+        else:
+            chunk_id = self.next_id
+            self.next_id += 1
+        self.produced.setdefault(path, []).append(chunk_id)
+        return chunk_id
+
+    def block_start(self, path):
+        own = self.reusable.get(path)
+        if own and own[-1] == self.next_id - 1:
+            self.next_id = own.pop()
+        if self.next_id == 0:
+            self.zero_pending = False
+        return self.next_id
+
+    def end_block(self, path, stop):
+        self.produced.setdefault(path, []).extend(range(self.next_id, stop))
+        self.next_id = stop
+
+
+class Manifest:
+    def __init__(self, fingerprint, files=None, tree=None):
+        self.fingerprint = fingerprint
+        self.files = files if files is not None else {}
+        self.tree = tree
+
+    @classmethod
+    def load(cls, output_dir):
+        try:
+            with open(os.path.join(output_dir, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(data.get("fingerprint"), data.get("files", {}), data.get("tree"))
+
+    def save(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, MANIFEST_FILENAME)
+        tmp = path + ".tmp"
+        data = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.fingerprint,
+            "tree": self.tree,
+            "files": self.files,
+        }
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def chunk_ids(self):
+        ids = set()
+        for entry in self.files.values():
+            ids.update(entry["chunks"])
+        return ids
+
+    def owner_of(self, chunk_id):
+        for path, entry in self.files.items():
+            if chunk_id in entry["chunks"]:
+                return path
+        return None
+
+    def unchanged(self, path, st):
+        entry = self.files.get(path)
+        return (entry is not None and entry["size"] == st.st_size
+                and entry["mtime_ns"] == st.st_mtime_ns)
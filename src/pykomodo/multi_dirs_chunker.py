@@ -1,9 +1,53 @@
 import os
-import fnmatch
-import re
 import concurrent.futures
+import threading
+import queue
+import itertools
+import collections
+import contextlib
+import functools
+import multiprocessing
+import time
 from pykomodo.tree_generator import TreeGenerator
 from pykomodo.pdf_processor import PDFProcessor
+from pykomodo.loader import (
+    MMAP_THRESHOLD,
+    READ_BLOCK_SIZE,
+    SNIFF_SIZE,
+    TEXT_EXTENSIONS,
+    ByteBudget,
+    LoadedFile,
+    content_hash,
+    iter_text_lines,
+    looks_binary,
+    new_content_hash,
+    read_file,
+)
+from pykomodo.redaction import DETECTORS, SecretRedactor
+from pykomodo.transform_cache import TransformCache, transform_key
+from pykomodo.watcher import PollingWatcher, open_watcher
+from pykomodo.git_index import find_work_tree, read_index
+from pykomodo.git_objects import (
+    BLOB_MODES,
+    CatFileBatch,
+    changed_paths,
+    changed_ranges,
+    list_tree,
+)
+from pykomodo.manifest import (
+    ChunkNumbering,
+    IncrementalNumbering,
+    Manifest,
+    chunk_path,
+    config_fingerprint,
+)
+from pykomodo.pattern_matcher import (
+    IGNORE_FILENAMES,
+    IgnoreFileRules,
+    compile_ignore_matcher,
+    compile_priority_matcher,
+    is_absolute_pattern,
+)
 import ast
 import json
 import hashlib
@@ -59,6 +103,35 @@ BUILTIN_IGNORES = [
     "venv"
 ]
 
+IGNORE_FILENAMES_SET = frozenset(IGNORE_FILENAMES)
+
+EXECUTORS = ("thread", "process")
+
+_plan_worker = None
+
+
+def _init_plan_worker(cls, kwargs, state, detectors):
+    global _plan_worker
+    DETECTORS.update(detectors)
+    _plan_worker = cls(**kwargs)
+    _plan_worker.__dict__.update(state)
+
+
+def _plan_in_worker(method, path, content, digest=None):
+    if digest is not None:
+        _plan_worker._content_hashes[path] = digest
+    before = _plan_worker.redaction_count
+    pieces = _plan_worker._plan_file(method, path, content)
+    return pieces, _plan_worker.redaction_count - before
+
+IGNORE_STAT_KEYS = (
+    "directories",
+    "entries",
+    "settled_by_directory",
+    "pattern_checks_avoided",
+    "ignore_files",
+)
+
 class PriorityRule:
     def __init__(self, pattern, score):
         self.pattern = pattern
@@ -104,12 +177,27 @@ class ParallelChunker:
         export_jsonl = False,
         export_path = None,
         export_embed_model = None,
+        stream = False,
+        queue_size = 256,
+        max_inflight_bytes = 256 * 1024 * 1024,
+        mmap_threshold = MMAP_THRESHOLD,
+        executor = "thread",
+        two_phase = False,
+        transform_cache_dir = None,
+        transform_cache_max_bytes = 512 * 1024 * 1024,
+        incremental = False,
+        from_git_index = False,
+        git_untracked = False,
         ):
         
         if equal_chunks is not None and max_chunk_size is not None:
             raise ValueError("Cannot specify both equal_chunks and max_chunk_size")
         if equal_chunks is None and max_chunk_size is None:
             raise ValueError("Must specify either equal_chunks or max_chunk_size")
+        if executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {', '.join(EXECUTORS)}")
+        if incremental and equal_chunks is not None:
+            raise ValueError("Incremental mode cannot be combined with equal_chunks")
         self.dir_ignore_names = self.DIR_IGNORE_NAMES
         self.equal_chunks = equal_chunks
         self.max_chunk_size = max_chunk_size
@@ -126,6 +214,24 @@ class ParallelChunker:
         self.export_path = export_path or os.path.join(self.output_dir, "chunks.jsonl")
         self.export_embed_model = export_embed_model or "unknown"
         self._export_rows = []
+        self.stream = stream
+        self.queue_size = max(1, queue_size)
+        self.max_inflight_bytes = max_inflight_bytes
+        self._byte_budget = ByteBudget(max_inflight_bytes)
+        self._file_stream = None
+        self.mmap_threshold = mmap_threshold
+        self.executor = executor
+        self.two_phase = two_phase
+        self.incremental = incremental
+        self.from_git_index = from_git_index
+        self.git_untracked = git_untracked
+        self._numbering = ChunkNumbering()
+        self._manifest = None
+        self._walked_dirs = []
+        self._content_hashes = {}
+        self._index_entries = {}
+        self._ignore_file_rules = {}
+        self._tree_paths = None
 
         if user_ignore is None:
             user_ignore = []
@@ -158,6 +264,17 @@ class ParallelChunker:
                     pat, score = rule_data
                     self.priority_rules.append(PriorityRule(pat, score))
 
+        self._ignore_matcher = None
+        self._priority_matcher = None
+        self._run_lock = threading.RLock()
+        self.ignore_stats = {}
+        self._redaction_lock = threading.Lock()
+        self.redaction_count = 0
+        self.redactor = SecretRedactor()
+        self.transform_cache = None
+        if transform_cache_dir:
+            self.transform_cache = TransformCache(transform_cache_dir, transform_cache_max_bytes)
+
         self.loaded_files = []
         self.current_walk_root = None
         self.tree_generator = TreeGenerator()
@@ -171,190 +288,897 @@ class ParallelChunker:
     def _get_text_content(self, path, content_bytes):
         if path.lower().endswith(".pdf"):
             return self.pdf_processor.extract_text_from_pdf(path)
-        else:
+        return self._transform_text(path, content_bytes)
+
+    def _transform_text(self, path, content_bytes):
+        cache = self.transform_cache
+        if cache is None:
             text = content_bytes.decode("utf-8", errors="replace")
-            text = self._filter_api_keys(text)
+            return self._filter_api_keys(text, path)
+        digest = self._content_hashes.get(path) or content_hash(content_bytes)
+        key = transform_key(digest, self.redactor.fingerprint(path))
+        cached = cache.get(key)
+        if cached is not None:
+            text, count = cached
+            if count:
+                self._count_redactions(count)
+            if text is None:
+                text = "\n".join(content_bytes.decode("utf-8", errors="replace").splitlines())
             return text
+        text = content_bytes.decode("utf-8", errors="replace")
+        result, count = self.redactor.redact_text(text, path)
+        if count:
+            self._count_redactions(count)
+        cache.put(key, result if count else None, count)
+        return result
 
     def is_absolute_pattern(self, pattern):
-        if pattern.startswith("/"):
-            return True
-        if re.match(r"^[a-zA-Z]:\\", pattern):
-            return True
-        return False
+        return is_absolute_pattern(pattern)
     
-    def _contains_api_key(self, line):
-        pattern = r'[\'"].*[a-zA-Z0-9_-]{20,}.*[\'"]'
-        return bool(re.search(pattern, line))
+    def _contains_api_key(self, line, path=None):
+        return self.redactor.redact_lines([line], path) > 0
 
-    def _filter_api_keys(self, text):
-        lines = text.splitlines()
-        filtered_lines = []
-        for line in lines:
-            contains_key = self._contains_api_key(line)
-            if contains_key:
-                filtered_lines.append("[API_KEY_REDACTED]")
-            else:
-                filtered_lines.append(line)
-        result = "\n".join(filtered_lines)
+    def _filter_api_keys(self, text, path=None):
+        result, count = self.redactor.redact_text(text, path)
+        if count:
+            self._count_redactions(count)
         return result
 
-    def _match_segments(self, path_segs, pattern_segs, pi=0, pj=0):
-        if pj == len(pattern_segs):
-            return pi == len(path_segs)
-        if pi == len(path_segs):
-            for seg in pattern_segs[pj:]:
-                if seg != '**':
-                    return False
-            return True
-
-        seg_pat = pattern_segs[pj]
-        if seg_pat == "**":
-            if self._match_segments(path_segs, pattern_segs, pi, pj + 1):
-                return True
-            return self._match_segments(path_segs, pattern_segs, pi + 1, pj)
-        if fnmatch.fnmatch(path_segs[pi], seg_pat):
-            return self._match_segments(path_segs, pattern_segs, pi + 1, pj + 1)
-        return False
-
-    def _double_star_fnmatch(self, path, pattern):
-        path = path.replace("\\", "/")
-        pattern = pattern.replace("\\", "/")
-        return self._match_segments(path.split("/"), pattern.split("/"))
-
-    def _matches_pattern(self, abs_path, rel_path, pattern):
-        if self.is_absolute_pattern(pattern):
-            target = abs_path
-        else:
-            target = rel_path
-
-        if "**" in pattern:
-            if self._double_star_fnmatch(target, pattern):
-                return True
-        else:
-            if fnmatch.fnmatch(target, pattern):
-                return True
-        if not self.is_absolute_pattern(pattern) and "/" not in pattern:
-            if fnmatch.fnmatch(os.path.basename(abs_path), pattern):
-                return True
-        return False
-    
-    def _read_ignore_file(self, directory):
-        for filename in ['.pykomodo-ignore', '.gitignore']:
-            ignore_file_path = os.path.join(directory, filename)
-            if os.path.exists(ignore_file_path):
-                try:
-                    with open(ignore_file_path, 'r') as f:
-                        for line in f:
-                            line = line.strip()
-                            if line and not line.startswith('#'):
-                                if filename == '.gitignore' and '**' not in line:
-                                    if not line.startswith('/'):
-                                        line = f"**/{line}"
-                                    if line.endswith('/'):
-                                        line = f"{line}**"
-                                self.ignore_patterns.append(line)
-                except:
-                    print(f"Error reading {filename}")
+    def _count_redactions(self, count):
+        with self._redaction_lock:
+            self.redaction_count += count
+
+    def _is_mapped(self, item):
+        return (isinstance(item, LoadedFile) and not item.is_resident
+                and item.source is None and item.size >= self.mmap_threshold
+                and not item.path.lower().endswith(".pdf"))
+
+    def _mapped_lines(self, path):
+        batch = []
+        pending = None
+        for line in iter_text_lines(path):
+            batch.append(line)
+            if len(batch) < 1024:
+                continue
+            count = self.redactor.redact_lines(batch, path)
+            if count:
+                self._count_redactions(count)
+            if pending is not None:
+                yield pending
+            pending = batch.pop()
+            yield from batch
+            batch = []
+        count = self.redactor.redact_lines(batch, path)
+        if count:
+            self._count_redactions(count)
+        if batch:
+            if pending is not None:
+                yield pending
+            pending = batch.pop()
+            yield from batch
+        if pending:
+            yield pending
+
+    def _iter_text_lines(self, item):
+        if self._is_mapped(item):
+            lines = self._mapped_lines(item.path)
+            first = next(lines, None)
+            if first is None:
+                return None
+            return itertools.chain((first,), lines)
+        text = self._get_text_content(item[0], item[1])
+        if not text:
+            return None
+        return text.splitlines()
+
+    def _read_ignore_file(self, directory, prefix=""):
+        key = (os.path.abspath(directory), prefix)
+        if key in self._ignore_file_rules:
+            return self._ignore_file_rules[key]
+        found = {}
+        for filename in IGNORE_FILENAMES:
+            try:
+                with open(os.path.join(directory, filename), 'r') as f:
+                    found[filename] = f.readlines()
+            except FileNotFoundError:
+                continue
+            except:
+                print(f"Error reading {filename}")
+        rules = self._ignore_file_rules[key] = self._ignore_rules(found, prefix)
+        return rules
+
+    def _ignore_rules(self, found, prefix):
+        if not found:
+            return None
+        rules = IgnoreFileRules.from_lines(found.get(".gitignore", ()), prefix,
+                                           found.get(".pykomodo-ignore", ()))
+        if not rules:
+            return None
+        return rules
+
+    def _tree_ignore_reader(self, reader, entries):
+        blobs = {}
+        for entry in entries:
+            parent, _, name = entry.path.rpartition("/")
+            if name in IGNORE_FILENAMES_SET and entry.mode in BLOB_MODES:
+                blobs.setdefault(parent, {})[name] = entry.sha
+
+        def read_rules(rel_dir, prefix):
+            found = blobs.get(rel_dir)
+            if not found:
+                return None
+            texts = {}
+            for filename, sha in found.items():
+                text = (reader.read(sha) or b"").decode("utf-8", errors="replace")
+                texts[filename] = text.splitlines()
+            return self._ignore_rules(texts, prefix)
+
+        return read_rules
 
     def should_ignore_file(self, path):
         abs_path = os.path.abspath(path)
         root = self.current_walk_root or os.path.dirname(abs_path)
         rel_path = os.path.relpath(abs_path, start=root).replace("\\", "/")
-        for pat in self.ignore_patterns:
-            if self._matches_pattern(abs_path, rel_path, pat):
-                for unignore_pat in self.unignore_patterns:
-                    if self._matches_pattern(abs_path, rel_path, unignore_pat):
-                        return False  
-                return True  
-        
-        return False
-
-    def is_binary_file(self, path):
+        return self._get_ignore_matcher().should_ignore(abs_path, rel_path)
+
+    def _get_ignore_matcher(self):
+        key = (tuple(self.ignore_patterns), tuple(self.unignore_patterns))
+        cached = self._ignore_matcher
+        if cached is None or cached[0] != key:
+            cached = (key, compile_ignore_matcher(*key))
+            self._ignore_matcher = cached
+        return cached[1]
+
+    def _get_priority_matcher(self):
+        key = tuple((rule.pattern, rule.score) for rule in self.priority_rules)
+        cached = self._priority_matcher
+        if cached is None or cached[0] != key:
+            cached = (key, compile_priority_matcher(key))
+            self._priority_matcher = cached
+        return cached[1]
+
+    def _classify_extension(self, path):
         ext = path.split(".")[-1].lower()
         if ext in {"py", "pdf"}:
             return False
         if ext in self.binary_exts:
             return True
+        if ext in TEXT_EXTENSIONS:
+            return False
+        return None
+
+    def is_binary_file(self, path):
+        is_binary = self._classify_extension(path)
+        if is_binary is not None:
+            return is_binary
         try:
             with open(path, "rb") as f:
-                chunk = f.read(8192)
-                if b"\0" in chunk:
+                chunk = f.read(SNIFF_SIZE)
+                if looks_binary(chunk):
                     return True
         except OSError:
             return True
         return False
 
+    def _ignore_in_directory(self, context, name, stats, is_dir=False):
+        stats["entries"] += 1
+        stats["pattern_checks_avoided"] += context.checks_avoided
+        if context.settled is not None:
+            stats["settled_by_directory"] += 1
+            return context.settled
+        return context.should_ignore(name, is_dir)
+
+    def _is_output_path(self, abs_path):
+        return os.path.commonpath([self._output_dir_abs, abs_path]) == self._output_dir_abs
+
+    def _scan_directory(self, path, context):
+        stats = dict.fromkeys(IGNORE_STAT_KEYS, 0)
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return files, subdirs, stats
+
+        stats["directories"] = 1
+        if any(entry.name in IGNORE_FILENAMES_SET for entry in entries):
+            rules = self._read_ignore_file(path, context.ignore.rel_prefix)
+            if rules is not None:
+                context = context.with_rules(rules)
+                stats["ignore_files"] = 1
+
+        for entry in entries:
+            name = entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                if entry.is_symlink() or name in self.dir_ignore_names:
+                    continue
+                if self._ignore_in_directory(context, name, stats, is_dir=True):
+                    continue
+                if os.path.join(context.ignore.abs_dir, name) == self._output_dir_abs:
+                    continue
+                subdirs.append((entry.path, context.child(name)))
+                continue
+
+            if self.file_type:
+                if not name.lower().endswith(f".{self.file_type}"):
+                    continue
+            if self._ignore_in_directory(context, name, stats):
+                continue
+            files.append(entry.path)
+
+        return files, subdirs, stats
+
     def _collect_paths(self, dir_list):
-        collected = []
-        for directory in dir_list:
-            self.current_walk_root = os.path.abspath(directory)
-            for root, dirs, files in os.walk(directory):
-                new_dirs = []
-                for d in dirs:
-                    if d in self.dir_ignore_names:
-                        continue
-                    full_dir = os.path.join(root, d)
-                    if self.should_ignore_file(full_dir):
-                        continue
-                    new_dirs.append(d)
-                dirs[:] = new_dirs
-                
-                for filename in files:
-                    full_path = os.path.join(root, filename)
-                    
-                    if self.file_type:
-                        if not filename.lower().endswith(f".{self.file_type}"):
-                            continue
-
-                    full_abs = os.path.abspath(full_path)
-                    if os.path.commonpath([self._output_dir_abs, full_abs]) == self._output_dir_abs:
-                        continue
+        return list(self._enumerate_paths(dir_list))
 
-                    if self.should_ignore_file(full_path):
-                        continue
+    def _enumerate_paths(self, dir_list):
+        if self.from_git_index:
+            paths = self._git_index_paths(dir_list)
+            if paths is not None:
+                return paths
+        return self._walk_paths(dir_list)
 
-                    collected.append(full_path)
-        return collected
+    def _git_index_paths(self, dir_list):
+        listings = []
+        for directory in dir_list:
+            root = os.path.abspath(directory)
+            if self._is_output_path(root):
+                continue
+            found = find_work_tree(root)
+            if found is None:
+                print(f"[Warn] {directory} is not inside a git work tree; walking instead")
+                return None
+            work_tree, git_dir = found
+            try:
+                entries = read_index(git_dir)
+                index_mtime = os.stat(os.path.join(git_dir, "index")).st_mtime_ns
+            except (OSError, ValueError) as e:
+                print(f"[Warn] Could not read the git index for {directory} ({e}); walking instead")
+                return None
+            prefix = os.path.relpath(root, work_tree).replace(os.sep, "/")
+            prefix = "" if prefix == "." else prefix + "/"
+            listings.append((directory, root, prefix, entries, index_mtime))
+
+        if self.git_untracked:
+            # One walk applies the ignore rules to tracked and untracked files
+            # alike; the index only orders tracked files first.
+            walked = list(self._walk_paths(dir_list))
+            included = set(walked)
+            tracked = [path for path in self._index_listing(listings, False) if path in included]
+            known = set(tracked)
+            return tracked + [path for path in walked if path not in known]
+
+        tracked = []
+        walked_dirs = set(directory for directory, *_ in listings)
+        for path in self._index_listing(listings):
+            tracked.append(path)
+            walked_dirs.add(os.path.dirname(path))
+        if dir_list:
+            self.current_walk_root = os.path.abspath(dir_list[-1])
+        self.ignore_stats = dict.fromkeys(IGNORE_STAT_KEYS, 0)
+        self._walked_dirs = sorted(walked_dirs)
+        return tracked
+
+    def _index_listing(self, listings, check_ignores=True):
+        for directory, root, prefix, entries, index_mtime in listings:
+            contexts = {}
+            for entry in entries:
+                if not entry.path.startswith(prefix):
+                    continue
+                rel = entry.path[len(prefix):]
+                if check_ignores and not self._index_path_included(root, rel, contexts):
+                    continue
+                path = os.path.join(directory, *rel.split("/"))
+                # Entries written in the same tick as the index may still change
+                # without a size or mtime change, so git re-hashes them too.
+                if entry.mtime_ns < index_mtime:
+                    self._index_entries[path] = entry
+                yield path
+
+    def _index_path_included(self, root, rel, contexts, read_rules=None):
+        parent, _, name = rel.rpartition("/")
+        context = self._index_dir_context(root, parent, contexts, read_rules)
+        if context is None:
+            return False
+        if self.file_type and not name.lower().endswith(f".{self.file_type}"):
+            return False
+        return not context.should_ignore(name)
+
+    def _index_dir_context(self, root, rel_dir, contexts, read_rules):
+        if rel_dir in contexts:
+            return contexts[rel_dir]
+        abs_dir = os.path.join(root, *rel_dir.split("/")) if rel_dir else root
+        if not rel_dir:
+            context = self._get_ignore_matcher().directory(root)
+        else:
+            head, _, name = rel_dir.rpartition("/")
+            context = self._index_dir_context(root, head, contexts, read_rules)
+            if context is not None:
+                if (name in self.dir_ignore_names or abs_dir == self._output_dir_abs
+                        or context.should_ignore(name, True)):
+                    context = None
+                else:
+                    context = context.child(name)
+        if context is not None:
+            if read_rules is None:
+                rules = self._read_ignore_file(abs_dir, context.ignore.rel_prefix)
+            else:
+                rules = read_rules(rel_dir, context.ignore.rel_prefix)
+            if rules is not None:
+                context = context.with_rules(rules)
+        contexts[rel_dir] = context
+        return context
+
+    def _walk_paths(self, dir_list):
+        matcher = self._get_ignore_matcher()
+        self.ignore_stats = dict.fromkeys(IGNORE_STAT_KEYS, 0)
+        self._walked_dirs = []
+        listings = {}
+        roots = []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.num_threads or 1) as executor:
+            pending = {}
+            for idx, directory in enumerate(dir_list):
+                self.current_walk_root = os.path.abspath(directory)
+                if self._is_output_path(self.current_walk_root):
+                    continue
+                key = (idx, directory)
+                roots.append(key)
+                context = matcher.directory(self.current_walk_root)
+                pending[executor.submit(self._scan_directory, directory, context)] = key
+
+            stack = roots[::-1]
+            while stack:
+                while stack and stack[-1] in listings:
+                    files, children = listings.pop(stack.pop())
+                    yield from files
+                    stack.extend(reversed(children))
+                if not pending:
+                    break
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    idx, path = pending.pop(future)
+                    files, subdirs, stats = future.result()
+                    for name, value in stats.items():
+                        self.ignore_stats[name] += value
+                    children = []
+                    for sub_path, sub_context in subdirs:
+                        key = (idx, sub_path)
+                        children.append(key)
+                        pending[executor.submit(self._scan_directory, sub_path, sub_context)] = key
+                    listings[(idx, path)] = (files, children)
+                    self._walked_dirs.append(path)
+
+        if self.verbose:
+            print(
+                f"Ignore matching: {self.ignore_stats['entries']} entries in "
+                f"{self.ignore_stats['directories']} directories, "
+                f"{self.ignore_stats['settled_by_directory']} settled by directory, "
+                f"{self.ignore_stats['pattern_checks_avoided']} pattern checks avoided"
+            )
 
     def _load_file_data(self, path):
         try:
-            if self.is_binary_file(path):
+            is_binary = self._classify_extension(path)
+            if is_binary:
                 return path, None, 0
             with open(path, "rb") as f:
                 content = f.read()
+            if is_binary is None and looks_binary(content):
+                return path, None, 0
             return path, content, self.calculate_priority(path)
         except:
             return path, None, 0
 
+    def _load_file_record(self, path):
+        is_binary = self._classify_extension(path)
+        if is_binary:
+            return None
+        sniff = is_binary is None
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                expected = st.st_size
+                entry = self._index_entries.get(path)
+                if entry is not None and (entry.size != expected or entry.mtime_ns != st.st_mtime_ns):
+                    entry = None
+                budget = self._byte_budget
+                if (budget is not None and expected < self.mmap_threshold
+                        and budget.try_acquire(expected)):
+                    content = f.read()
+                    budget.release(expected - len(content))
+                    if sniff and looks_binary(content):
+                        budget.release(len(content))
+                        return None
+                    size = len(content)
+                    digest = entry.sha if entry is not None else content_hash(content)
+                    self._content_hashes[path] = digest
+                else:
+                    budget = None
+                    content = None
+                    block = f.read(READ_BLOCK_SIZE)
+                    if sniff and looks_binary(block):
+                        return None
+                    if entry is not None and expected:
+                        # Clean in the index: the blob id already names this content.
+                        return LoadedFile(path, expected, self.calculate_priority(path), entry.sha)
+                    hasher = new_content_hash()
+                    size = 0
+                    while block:
+                        hasher.update(block)
+                        size += len(block)
+                        block = f.read(READ_BLOCK_SIZE)
+                    digest = hasher.hexdigest()
+        except:
+            return None
+        if not size:
+            return None
+        return LoadedFile(path, size, self.calculate_priority(path), digest, content, budget)
+
     def calculate_priority(self, path):
-        highest = 0
-        basename = os.path.basename(path)
-        for rule in self.priority_rules:
-            if fnmatch.fnmatch(basename, rule.pattern):
-                highest = max(highest, rule.score)
-        return highest
+        return self._get_priority_matcher().priority(path)
 
     def process_directories(self, dirs):
+        with self._run_lock:
+            self._process_directories(dirs)
+
+    def _reset_run_state(self):
+        self.tree_generator.reset()
+        self._cached_tree_header = None
+        self._cached_tree_root = None
+        self._export_rows = []
+        self._file_stream = None
+        self._byte_budget = ByteBudget(self.max_inflight_bytes)
+        self.redaction_count = 0
+        self._numbering = ChunkNumbering()
+        self._manifest = None
+        self._content_hashes = {}
+        self._index_entries = {}
+        self._ignore_file_rules = {}
+        self._tree_paths = None
+        self.loaded_files.clear()
+
+    def _process_directories(self, dirs):
         if dirs:
             self.current_walk_root = os.path.abspath(dirs[0])
         
-        self.tree_generator.reset()
-        
-        for directory in dirs:
-            self._read_ignore_file(directory)
-        
-        all_paths = self._collect_paths(dirs)
-        self.loaded_files.clear()
+        self._reset_run_state()
         
         if self.dry_run:
-            self._handle_dry_run(all_paths)
+            self._handle_dry_run(self._collect_paths(dirs))
+            return
+
+        if self.incremental:
+            self._process_incremental(dirs)
             return
         
-        self._load_files_parallel(all_paths)
+        self._chunk_loaded(self._iter_loaded(self._enumerate_paths(dirs)))
+
+    def process_paths(self, paths, root=None, force_process=False):
+        with self._run_lock:
+            return self._process_paths(paths, root, force_process)
+
+    def _process_paths(self, paths, root, force_process=False):
+        if self.incremental:
+            raise ValueError("Incremental mode cannot be combined with an explicit path list")
+        self._reset_run_state()
+        self.current_walk_root = os.path.abspath(root or os.getcwd())
+        self._tree_paths = []
+        listed = self._iter_listed_paths(paths, force_process)
+
+        if self.dry_run:
+            listed = list(listed)
+            self._handle_dry_run(listed)
+            return len(listed)
+        if self.stream and not self.equal_chunks:
+            listed = list(listed)
+        self._chunk_loaded(self._iter_loaded(listed))
+        return len(self.loaded_files)
+
+    def _iter_listed_paths(self, paths, force_process=False):
+        root = self.current_walk_root
+        contexts = {}
+        seen = set()
+        for path in paths:
+            path = os.fspath(path)
+            if not path or path in seen:
+                continue
+            seen.add(path)
+            abs_path = os.path.abspath(path)
+            if self._is_output_path(abs_path) or not os.path.isfile(abs_path):
+                continue
+            if self.file_type and not path.lower().endswith(f".{self.file_type}"):
+                continue
+            rel = os.path.relpath(abs_path, root)
+            if not force_process:
+                # Paths under the root see the same ignore files as a walk would.
+                if rel.split(os.sep, 1)[0] == os.pardir:
+                    if self.should_ignore_file(abs_path):
+                        continue
+                elif not self._index_path_included(root, rel.replace(os.sep, "/"), contexts):
+                    continue
+            self._tree_paths.append(rel)
+            yield path
+
+    def process_git_ref(self, repo, ref="HEAD"):
+        with self._run_lock:
+            self._process_git_ref(repo, ref)
+
+    def _process_git_ref(self, repo, ref):
+        if self.incremental:
+            raise ValueError("Incremental mode cannot be combined with a git ref")
+        entries = list_tree(repo, ref)
+        root = os.path.abspath(repo)
+        self._reset_run_state()
+        self.current_walk_root = root
+        self._tree_paths = [e.path for e in entries]
+        # Ignore files and over-budget blobs are read on demand through one
+        # batch process; the streaming batch below is busy until it finishes.
+        objects = CatFileBatch(repo)
+        try:
+            selected = self._select_entries(repo, objects, entries)
+            if self.dry_run:
+                self._handle_dry_run([path for path, _ in selected])
+                return
+            reader = CatFileBatch(repo)
+            try:
+                self._chunk_loaded(self._iter_blobs(reader, objects, selected))
+            finally:
+                reader.close()
+        finally:
+            objects.close()
+
+    def _select_entries(self, repo, objects, entries, changed=None):
+        root = os.path.abspath(repo)
+        contexts = {}
+        read_rules = self._tree_ignore_reader(objects, entries)
+        selected = []
+        for entry in entries:
+            if changed is not None and entry.path not in changed:
+                continue
+            if entry.mode not in BLOB_MODES:
+                continue
+            path = os.path.join(repo, *entry.path.split("/"))
+            if path.lower().endswith(".pdf"):
+                if self.verbose:
+                    print(f"[Warn] Skipping {path}: PDFs are not read from git objects")
+                continue
+            if self._classify_extension(path) or not entry.size:
+                continue
+            if self._index_path_included(root, entry.path, contexts, read_rules):
+                selected.append((path, entry))
+        return selected
+
+    def _iter_blobs(self, reader, objects, selected):
+        budget = self._byte_budget
+        blobs = reader.iter_blobs(entry.sha for _, entry in selected)
+        try:
+            for (path, entry), (_, content) in zip(selected, blobs):
+                if not content or looks_binary(content):
+                    continue
+                size = len(content)
+                source = functools.partial(objects.read, entry.sha)
+                if budget is None or not budget.try_acquire(size):
+                    content = None
+                self._content_hashes[path] = entry.sha
+                yield LoadedFile(path, size, self.calculate_priority(path), entry.sha,
+                                 content, budget, source)
+        finally:
+            blobs.close()
+
+    def process_git_diff(self, repo, base, head=None, hunk_context=None):
+        with self._run_lock:
+            self._process_git_diff(repo, base, head, hunk_context)
+
+    def _process_git_diff(self, repo, base, head, hunk_context):
+        if self.incremental:
+            raise ValueError("Incremental mode cannot be combined with a git diff")
+        changed = set(changed_paths(repo, base, head))
+        ranges = None
+        if hunk_context is not None:
+            ranges = {}
+            for rel, hunks in changed_ranges(repo, base, head, hunk_context).items():
+                ranges[os.path.join(repo, *rel.split("/"))] = hunks
+        root = os.path.abspath(repo)
+        self._reset_run_state()
+        self.current_walk_root = root
+
+        reader = objects = None
+        if head is None:
+            contexts = {}
+            paths = []
+            for rel in sorted(changed):
+                if self._index_path_included(root, rel, contexts):
+                    paths.append(os.path.join(repo, *rel.split("/")))
+            if self.dry_run:
+                self._handle_dry_run(paths)
+                return
+            loaded = self._iter_loaded(paths)
+        else:
+            entries = list_tree(repo, head)
+            self._tree_paths = [e.path for e in entries]
+            objects = CatFileBatch(repo)
+            try:
+                selected = self._select_entries(repo, objects, entries, changed)
+            except BaseException:
+                objects.close()
+                raise
+            if self.dry_run:
+                objects.close()
+                self._handle_dry_run([path for path, _ in selected])
+                return
+            reader = CatFileBatch(repo)
+            loaded = self._iter_blobs(reader, objects, selected)
+
+        if ranges is not None:
+            loaded = self._iter_hunks(loaded, ranges)
+        try:
+            self._chunk_loaded(loaded)
+        finally:
+            loaded.close()
+            if reader is not None:
+                reader.close()
+                objects.close()
+
+    def _iter_hunks(self, loaded, ranges):
+        try:
+            for item in loaded:
+                hunks = ranges.get(item.path)
+                if not hunks:
+                    item.release()
+                    continue
+                lines = item.content.split(b"\n")
+                parts = []
+                for start, count in hunks:
+                    if not count:
+                        parts.append(f"@@ lines removed after line {start} @@".encode("utf-8"))
+                        continue
+                    parts.append(f"@@ lines {start}-{start + count - 1} @@".encode("utf-8"))
+                    parts.extend(lines[start - 1:start - 1 + count])
+                item.release()
+                excerpt = b"\n".join(parts) + b"\n"
+                self._content_hashes.pop(item.path, None)
+                yield LoadedFile(item.path, len(excerpt), item.priority, content_hash(excerpt), excerpt)
+        finally:
+            loaded.close()
+
+    def _chunk_loaded(self, loaded):
+        if self.stream and not self.equal_chunks:
+            self._file_stream = loaded
+            try:
+                self._process_chunks()
+            finally:
+                self._file_stream = None
+                loaded.close()
+            return
+
+        self.loaded_files.extend(loaded)
         self.loaded_files.sort(key=lambda x: (-x[2], x[0]))
         self._process_chunks()
     
+    def watch(self, dirs, debounce=0.5, poll_interval=1.0, stop_event=None, use_inotify=True):
+        if self.equal_chunks:
+            raise ValueError("Watch mode cannot be combined with equal_chunks")
+        self.incremental = True
+        if stop_event is None:
+            stop_event = threading.Event()
+        watcher = open_watcher(use_inotify, poll_interval)
+        try:
+            watcher = self._watch_pass(dirs, watcher, None, poll_interval)
+            while not stop_event.is_set():
+                changed, rescan = watcher.wait(poll_interval)
+                if not changed and not rescan:
+                    continue
+                deadline = time.monotonic() + debounce * 10
+                while not stop_event.is_set() and time.monotonic() < deadline:
+                    more, more_rescan = watcher.wait(debounce)
+                    if not more and not more_rescan:
+                        break
+                    changed |= more
+                    rescan = rescan or more_rescan
+                if rescan or any(os.path.basename(path) in IGNORE_FILENAMES_SET for path in changed):
+                    changed = None
+                watcher = self._watch_pass(dirs, watcher, changed, poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+
+    def _watch_pass(self, dirs, watcher, changed, poll_interval):
+        with self._run_lock:
+            self.current_walk_root = os.path.abspath(dirs[0])
+            self._reset_run_state()
+            self._process_incremental(dirs, changed)
+            if changed is not None:
+                return watcher
+            files = list(self._manifest.files)
+            try:
+                watcher.reset(files, self._walked_dirs)
+            except OSError:
+                watcher.close()
+                watcher = PollingWatcher(poll_interval)
+                watcher.reset(files, self._walked_dirs)
+        return watcher
+
+    def _incremental_config(self):
+        return {
+            "chunker": type(self).__name__,
+            "max_chunk_size": self.max_chunk_size,
+            "semantic_chunking": self.semantic_chunking,
+            "root": self.current_walk_root,
+            "redaction": self.redactor.config_fingerprint(),
+            "export": [self.export_jsonl, self.export_path, self.export_embed_model],
+        }
+
+    def _process_incremental(self, dirs, changed=None):
+        started = time.time()
+        stats = {}
+        if changed is None:
+            paths = self._enumerate_paths(dirs)
+        else:
+            self.current_walk_root = os.path.abspath(dirs[-1])
+            paths = filter(None, (self._included_path(dirs, path) for path in changed))
+        for path in paths:
+            try:
+                stats[path] = os.stat(path)
+            except OSError:
+                continue
+
+        fingerprint = config_fingerprint(self._incremental_config())
+        previous = Manifest.load(self.output_dir)
+        if previous is not None and previous.fingerprint != fingerprint:
+            self._delete_chunks(previous.chunk_ids())
+            previous = None
+        if previous is None:
+            if changed is not None:
+                return self._process_incremental(dirs)
+            previous = Manifest(fingerprint)
+
+        present = set(stats)
+        if changed is not None:
+            gone = set(changed) - present
+            present.update(path for path in previous.files if path not in gone)
+
+        manifest = Manifest(fingerprint, tree=previous.tree)
+        if changed is None or present != set(previous.files):
+            manifest.tree = content_hash(self._tree_header().encode("utf-8"))
+        dirty = []
+        for path in itertools.chain(stats, sorted(present.difference(stats))):
+            st = stats.get(path)
+            if st is None or previous.unchanged(path, st):
+                manifest.files[path] = previous.files[path]
+            else:
+                dirty.append(path)
+
+        forced = set()
+        owner = previous.owner_of(0)
+        zero_free = owner not in present
+        if zero_free:
+            candidates = [path for path in present
+                          if path in previous.files and previous.files[path]["chunks"]]
+            if candidates:
+                forced.add(min(candidates, key=lambda p: min(previous.files[p]["chunks"])))
+        elif owner in present and manifest.tree != previous.tree:
+            forced.add(owner)
+        for path in forced:
+            if manifest.files.pop(path, None) is not None:
+                dirty.append(path)
+
+        reusable = {}
+        for path in dirty:
+            if path in previous.files:
+                reusable[path] = sorted(previous.files[path]["chunks"])
+        claimed = manifest.chunk_ids()
+        for ids in reusable.values():
+            claimed.update(ids)
+        old_ids = previous.chunk_ids()
+        next_id = max(old_ids | claimed) + 1 if old_ids | claimed else 0
+        free = set(range(next_id)) - claimed - {0}
+
+        numbering = IncrementalNumbering(next_id, free, reusable, zero_free)
+        self._numbering = numbering
+        self._manifest = manifest
+        records = {}
+        self._chunk_loaded(self._iter_changed(self._iter_loaded(dirty), previous, forced, records))
+
+        for path, (size, digest, kept) in records.items():
+            st = stats.get(path) or os.stat(path)
+            if kept:
+                chunks = previous.files[path]["chunks"]
+            else:
+                chunks = numbering.produced.get(path, [])
+            manifest.files[path] = {
+                "size": size,
+                "mtime_ns": st.st_mtime_ns if st.st_mtime < started - 2 else None,
+                "hash": digest,
+                "chunks": chunks,
+            }
+
+        owned = manifest.chunk_ids()
+        stale = old_ids - owned
+        self._delete_chunks(stale)
+        manifest.save(self.output_dir)
+        if self.export_jsonl:
+            self._merge_export(stale | set(itertools.chain.from_iterable(numbering.produced.values())))
+
+        if self.verbose:
+            rechunked = sum(1 for _, _, kept in records.values() if not kept)
+            removed = sum(1 for path in previous.files if path not in present)
+            print(f"Incremental: {rechunked} files re-chunked, {removed} removed, "
+                  f"{len(manifest.files) - rechunked} unchanged")
+
+    def _included_path(self, dirs, path):
+        matcher = self._get_ignore_matcher()
+        for directory in dirs:
+            root = os.path.abspath(directory)
+            rel = os.path.relpath(os.path.abspath(path), root)
+            if rel == os.curdir or rel.split(os.sep, 1)[0] == os.pardir or self._is_output_path(root):
+                continue
+            parts = rel.split(os.sep)
+            context = matcher.directory(root)
+            current = directory
+            for name in parts[:-1]:
+                context = self._with_ignore_file(current, context)
+                child = os.path.join(current, name)
+                if (name in self.dir_ignore_names or os.path.islink(child)
+                        or context.should_ignore(name, True)
+                        or os.path.abspath(child) == self._output_dir_abs):
+                    return None
+                current = child
+                context = context.child(name)
+            context = self._with_ignore_file(current, context)
+            name = parts[-1]
+            if self.file_type and not name.lower().endswith(f".{self.file_type}"):
+                return None
+            if context.should_ignore(name):
+                return None
+            return os.path.join(current, name)
+        return None
+
+    def _with_ignore_file(self, directory, context):
+        rules = self._read_ignore_file(directory, context.ignore.rel_prefix)
+        if rules is None:
+            return context
+        return context.with_rules(rules)
+
+    def _iter_changed(self, loaded, previous, forced, records):
+        for item in loaded:
+            entry = previous.files.get(item.path)
+            kept = (entry is not None and item.path not in forced
+                    and entry["hash"] == item.content_hash)
+            records[item.path] = (item.size, item.content_hash, kept)
+            if kept:
+                item.release()
+                continue
+            yield item
+
+    def _delete_chunks(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            try:
+                os.remove(chunk_path(self.output_dir, chunk_id))
+            except OSError:
+                pass
+
+    def _merge_export(self, replaced):
+        rows = []
+        try:
+            with open(self.export_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    if row["metadata"]["chunk_num"] not in replaced:
+                        rows.append(row)
+        except (OSError, ValueError, KeyError):
+            rows = []
+        rows.extend(self._export_rows)
+        rows.sort(key=lambda row: row["metadata"]["chunk_num"])
+        self._write_export(rows)
+
     def _handle_dry_run(self, paths):
         print("[DRY-RUN] The following files would be processed (in priority order):")
         
@@ -372,22 +1196,210 @@ class ParallelChunker:
             print(f"  - {path} (priority={priority})")
 
     def _load_files_parallel(self, all_paths):
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.num_threads)
-        futures = {}
-        
-        for path in all_paths:
-            future = executor.submit(self._load_file_data, path)
-            futures[future] = path
-        
-        for future in concurrent.futures.as_completed(futures):
-            path, content, priority = future.result()
-            
-            if content:
-                self.loaded_files.append((path, content, priority))
-        
-        executor.shutdown()
+        self.loaded_files.extend(self._iter_loaded(all_paths))
+
+    def _iter_loaded(self, paths):
+        path_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        done = object()
+        errors = []
+        num_loaders = max(1, self.num_threads or 1)
+        # Loaders finish out of order; results are reordered by walk position,
+        # and the walker stays at most this many paths ahead of the consumer.
+        window = threading.Semaphore(self.queue_size + num_loaders)
+
+        def put(q, item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def walk():
+            try:
+                for seq, path in enumerate(paths):
+                    while not window.acquire(timeout=0.1):
+                        if stop.is_set():
+                            return
+                    if not put(path_queue, (seq, path)):
+                        return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                for _ in range(num_loaders):
+                    put(path_queue, done)
+
+        def load():
+            try:
+                while not stop.is_set():
+                    try:
+                        path = path_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if path is done:
+                        break
+                    seq, path = path
+                    try:
+                        record = self._load_file_record(path)
+                    except Exception as e:
+                        errors.append(e)
+                        record = None
+                    if not put(result_queue, (seq, record)):
+                        return
+            finally:
+                put(result_queue, done)
+
+        threads = [threading.Thread(target=walk, daemon=True)]
+        for _ in range(num_loaders):
+            threads.append(threading.Thread(target=load, daemon=True))
+        for t in threads:
+            t.start()
+
+        try:
+            finished = 0
+            pending = {}
+            next_seq = 0
+            while finished < num_loaders:
+                result = result_queue.get()
+                if result is done:
+                    finished += 1
+                    continue
+                pending[result[0]] = result[1]
+                while next_seq in pending:
+                    item = pending.pop(next_seq)
+                    next_seq += 1
+                    window.release()
+                    if item is not None:
+                        yield item
+            if errors:
+                raise errors[0]
+        finally:
+            stop.set()
+            for t in threads:
+                t.join()
+
+    def _iter_loaded_files(self):
+        stream = self._file_stream
+        if stream is None:
+            for item in self.loaded_files:
+                yield item
+                self._release_content(item)
+            return
+        self._file_stream = None
+        for item in list(self.loaded_files):
+            yield item
+            self._release_content(item)
+        for item in stream:
+            self.loaded_files.append(item)
+            yield item
+            self._release_content(item)
+
+    def _release_content(self, item):
+        if isinstance(item, LoadedFile):
+            item.release()
+
+    def _plan_file(self, method, path, content):
+        if content is None:
+            content = read_file(path)
+        pieces = getattr(self, method)((path, content, 0))
+        if pieces is None:
+            return None
+        return list(pieces)
+
+    def _plan_worker_config(self):
+        kwargs = {
+            "max_chunk_size": self.max_chunk_size,
+            "num_threads": 1,
+            "semantic_chunking": self.semantic_chunking,
+            "file_type": self.file_type,
+            "verbose": self.verbose,
+        }
+        state = {"redactor": self.redactor, "transform_cache": self.transform_cache}
+        return kwargs, state
+
+    def _plan_pool(self):
+        if self.executor == "process":
+            # Workers start clean instead of forking a process that holds
+            # loader threads, open caches and loaded file contents.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            kwargs, state = self._plan_worker_config()
+            return concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.num_threads,
+                mp_context=context,
+                initializer=_init_plan_worker,
+                initargs=(type(self), kwargs, state, dict(DETECTORS)),
+            )
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self.num_threads)
+
+    def _iter_plans(self, method):
+        if self.executor != "process" and not self.two_phase:
+            plan = getattr(self, method)
+            for item in self._iter_loaded_files():
+                yield item[0], plan(item)
+            return
+        in_process = self.executor == "process"
+        pending = collections.deque()
+        with self._plan_pool() as pool:
+            for item in self._iter_loaded_files():
+                if self._is_mapped(item) or (in_process and item[0].lower().endswith(".pdf")):
+                    pending.append((item[0], getattr(self, method)(item)))
+                else:
+                    content = None
+                    digest = None
+                    if not isinstance(item, LoadedFile) or item.is_resident or item.source is not None:
+                        content = item[1]
+                        digest = self._content_hashes.get(item[0])
+                    if in_process:
+                        future = pool.submit(_plan_in_worker, method, item[0], content, digest)
+                    else:
+                        future = pool.submit(self._plan_file, method, item[0], content)
+                    pending.append((item[0], future))
+                if len(pending) >= self.queue_size:
+                    yield self._resolve_plan(pending.popleft())
+            while pending:
+                yield self._resolve_plan(pending.popleft())
+
+    def _resolve_plan(self, entry):
+        path, plan = entry
+        if isinstance(plan, concurrent.futures.Future):
+            plan = plan.result()
+            if self.executor == "process":
+                plan, redactions = plan
+                if redactions:
+                    self._count_redactions(redactions)
+        return path, plan
+
+    @contextlib.contextmanager
+    def _chunk_writes(self):
+        if not self.two_phase:
+            def write(fn, *args):
+                fn(*args)
+            yield write
+            return
+        self._tree_header()
+        pending = collections.deque()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.num_threads) as pool:
+            def write(fn, *args):
+                pending.append(pool.submit(fn, *args))
+                if len(pending) >= self.queue_size:
+                    pending.popleft().result()
+
+            try:
+                yield write
+            finally:
+                while pending:
+                    pending.popleft().result()
+        self._export_rows.sort(key=lambda row: row["metadata"]["chunk_num"])
 
     def process_file(self, file_path, custom_chunk_size = None, force_process = False):
+        with self._run_lock:
+            self._process_file(file_path, custom_chunk_size, force_process)
+
+    def _process_file(self, file_path, custom_chunk_size = None, force_process = False):
         if not os.path.isfile(file_path):
             raise ValueError(f"File not found: {file_path}")
             
@@ -410,6 +1422,8 @@ class ParallelChunker:
             return
             
         self.loaded_files = [(path, content, priority)]
+        self.redaction_count = 0
+        self._numbering = ChunkNumbering()
         
         original_max_chunk_size = None
         if custom_chunk_size is not None and not self.equal_chunks:
@@ -434,11 +1448,8 @@ class ParallelChunker:
         
         try:
             tree_header = ""
-            if chunk_num == 0 and self.current_walk_root:
-                if self._cached_tree_root != self.current_walk_root:
-                    self._cached_tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-                    self._cached_tree_root = self.current_walk_root
-                tree_header = self._cached_tree_header or ""
+            if chunk_num == 0:
+                tree_header = self._tree_header()
 
             if type(content_bytes) == bytes:
                 chunk_content = content_bytes.decode('utf-8', errors='replace')
@@ -474,6 +1485,15 @@ class ParallelChunker:
             except:
                 pass
     
+    def _tree_header(self):
+        if not self.current_walk_root:
+            return ""
+        if self._cached_tree_root != self.current_walk_root:
+            self._cached_tree_header = self.tree_generator.prepare_tree_header(
+                self.current_walk_root, paths=self._tree_paths)
+            self._cached_tree_root = self.current_walk_root
+        return self._cached_tree_header or ""
+
     def _normalize_text(self, s):
         return s.replace("\r\n", "\n").replace("\r", "\n")
 
@@ -489,6 +1509,11 @@ class ParallelChunker:
         return self.pdf_processor.process_pdf_for_chunking(path, idx, chunk_writer)
 
     def _process_chunks(self):
+        self._export_rows = []
+        if self._file_stream is not None and not self.loaded_files:
+            first = next(self._file_stream, None)
+            if first is not None:
+                self.loaded_files.append(first)
         if not self.loaded_files:
             return
         if self.semantic_chunking:
@@ -498,11 +1523,17 @@ class ParallelChunker:
         else:
             self._chunk_by_size()
 
-        if self.export_jsonl and self._export_rows:
-            os.makedirs(os.path.dirname(self.export_path), exist_ok=True)
-            with open(self.export_path, "w", encoding="utf-8") as f:
-                for row in self._export_rows:
-                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        if self.verbose:
+            print(f"Redacted {self.redaction_count} lines containing possible secrets")
+
+        if self.export_jsonl and self._export_rows and self._manifest is None:
+            self._write_export(self._export_rows)
+
+    def _write_export(self, rows):
+        os.makedirs(os.path.dirname(self.export_path), exist_ok=True)
+        with open(self.export_path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
 
     
     def _extract_pdf_paragraphs(self, path):
@@ -558,11 +1589,8 @@ class ParallelChunker:
 
     def _write_equal_chunk(self, chunk_data, chunk_num):
         tree_header = ""
-        if chunk_num == 0 and self.current_walk_root:
-            if self._cached_tree_root != self.current_walk_root:
-                self._cached_tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-                self._cached_tree_root = self.current_walk_root
-            tree_header = self._cached_tree_header or ""
+        if chunk_num == 0:
+            tree_header = self._tree_header()
         
         txt = tree_header
         txt += "="*80 + "\n" + f"CHUNK {chunk_num + 1} OF {self.equal_chunks}\n" + "="*80 + "\n\n"
@@ -613,63 +1641,71 @@ class ParallelChunker:
         chunk_data = "\n".join(header + lines) + "\n"
         self._write_chunk(chunk_data.encode("utf-8"), chunk_num - 1)
 
-    def _chunk_by_size(self):
-        chunk_num = 1
-        
-        for path, content_bytes, _ in self.loaded_files:
-            text = self._get_text_content(path, content_bytes)
-            
-            if not text:
-                header = self._build_chunk_header(chunk_num, path)
-                data = "\n".join(header + ["[Empty File]"]) + "\n"
-                self._write_chunk(data.encode("utf-8"), chunk_num - 1)
-                chunk_num += 1
-                continue
+    def _plan_size_chunks(self, item):
+        lines = self._iter_text_lines(item)
+        if lines is None:
+            return [["[Empty File]"]]
+        if item[0].lower().endswith(".pdf"):
+            return None
+        return self._split_lines_by_words(lines)
 
-            if path.lower().endswith(".pdf"):
-                next_idx = self.pdf_chunking(path, chunk_num - 1)
-                chunk_num = next_idx + 1
+    def _split_lines_by_words(self, lines):
+        current_lines = []
+        word_count = 0
+        
+        for line in lines:
+            if not line.strip():
+                current_lines.append(line)
                 continue
-
-            lines = text.splitlines()
-            current_lines = []
-            word_count = 0
-            
-            for line in lines:
-                if not line.strip():
-                    current_lines.append(line)
-                    continue
-                    
-                words = len(line.split())
                 
-                if word_count + words > self.max_chunk_size and current_lines:
-                    self._write_file_chunk(path, current_lines, chunk_num)
-                    chunk_num += 1
-                    current_lines = []
-                    word_count = 0
-                
-                current_lines.append(line)
-                word_count += words
+            words = len(line.split())
             
-            if current_lines:
-                self._write_file_chunk(path, current_lines, chunk_num)
-                chunk_num += 1
+            if word_count + words > self.max_chunk_size and current_lines:
+                yield current_lines
+                current_lines = []
+                word_count = 0
+            
+            current_lines.append(line)
+            word_count += words
+        
+        if current_lines:
+            yield current_lines
 
-    def _chunk_by_semantic(self):
-        chunk_index = 0
-        for path, content_bytes, _ in self.loaded_files:
-            text = self._get_text_content(path, content_bytes)
-            if not text and not path.lower().endswith(".pdf"):
-                continue
-            if path.endswith(".py"):
-                chunk_index = self._chunk_python_file_ast(path, text, chunk_index)
-            else:
-                chunk_index = self._chunk_nonpython_file_by_size(path, text, chunk_index)
+    def _chunk_by_size(self):
+        numbering = self._numbering
+        
+        with self._chunk_writes() as write:
+            for path, pieces in self._iter_plans("_plan_size_chunks"):
+                if pieces is None:
+                    start = numbering.block_start(path)
+                    numbering.end_block(path, self.pdf_chunking(path, start))
+                    continue
 
-    def _chunk_nonpython_file_by_size(self, path, text, chunk_index):
-        all_lines = text.splitlines()
-        if not all_lines:
-            t = (
+                for lines in pieces:
+                    write(self._write_file_chunk, path, lines, numbering.take(path) + 1)
+
+    def _plan_semantic_chunks(self, item):
+        path = item[0]
+        text = self._get_text_content(path, item[1])
+        if not text and not path.lower().endswith(".pdf"):
+            return []
+        if path.endswith(".py"):
+            return self._plan_python_file_ast(path, text)
+        return self._plan_nonpython_file_by_size(text)
+
+    def _chunk_by_semantic(self):
+        numbering = self._numbering
+        with self._chunk_writes() as write:
+            for path, pieces in self._iter_plans("_plan_semantic_chunks"):
+                for piece in pieces:
+                    write(self._write_semantic_chunk, path, piece, numbering.take(path))
+
+    def _write_semantic_chunk(self, path, piece, chunk_index):
+        kind, body = piece
+        if kind == "lines":
+            chunk_data = self._format_chunk_content(path, body, chunk_index)
+        elif kind == "empty":
+            chunk_data = (
                 "="*80 + "\n"
                 + f"CHUNK {chunk_index + 1}\n"
                 + "="*80 + "\n\n"
@@ -678,31 +1714,33 @@ class ParallelChunker:
                 + "="*40 + "\n"
                 + "[Empty File]\n"
             )
-            self._write_chunk(t.encode("utf-8"), chunk_index)
-            return chunk_index + 1
+        else:
+            chunk_data = body
+        self._write_chunk(chunk_data.encode("utf-8"), chunk_index)
+
+    def _plan_nonpython_file_by_size(self, text):
+        all_lines = text.splitlines()
+        if not all_lines:
+            return [("empty", None)]
 
+        pieces = []
         acc_lines = []
         current_size = 0
-        idx = chunk_index
 
         for line in all_lines:
             line_size = len(line.split())
 
             if self.max_chunk_size and (current_size + line_size) > self.max_chunk_size and acc_lines:
-                chunk_data = self._format_chunk_content(path, acc_lines, idx)
-                self._write_chunk(chunk_data.encode("utf-8"), idx)
-                idx += 1
+                pieces.append(("lines", acc_lines))
                 acc_lines = []
                 current_size = 0
 
             acc_lines.append(line)
             current_size += line_size
         if acc_lines:
-            chunk_data = self._format_chunk_content(path, acc_lines, idx)
-            self._write_chunk(chunk_data.encode("utf-8"), idx)
-            idx += 1
+            pieces.append(("lines", acc_lines))
 
-        return idx
+        return pieces
 
 
     def _format_chunk_content(self, path, lines, idx):
@@ -718,13 +1756,12 @@ class ParallelChunker:
         ]
         return "\n".join(h + lines) + "\n"
 
-    def _chunk_python_file_ast(self, path, text, chunk_index):
+    def _plan_python_file_ast(self, path, text):
         try:
             tree = ast.parse(text, filename=path)
         except SyntaxError:
             chunk_data = f"{'='*80}\nFILE: {path}\n{'='*80}\n\n{text}"
-            self._write_chunk(chunk_data.encode("utf-8"), chunk_index)
-            return chunk_index + 1
+            return [("text", chunk_data)]
 
         lines = text.splitlines()
 
@@ -762,6 +1799,7 @@ class ParallelChunker:
             block_text = f"{label} (lines {start}-{end})\n" + "\n".join(snippet)
             code_blocks.append(block_text)
 
+        pieces = []
         current_lines = []
         current_count = 0
 
@@ -777,21 +1815,18 @@ class ParallelChunker:
                 if current_lines:
                     chunk_data = "\n\n".join(current_lines)
                     final_text = f"{'='*80}\nFILE: {path}\n{'='*80}\n\n{chunk_data}"
-                    self._write_chunk(final_text.encode("utf-8"), chunk_index)
-                    chunk_index += 1
+                    pieces.append(("text", final_text))
                     current_lines = []
                     current_count = 0
 
                 big_block_data = f"{'='*80}\nFILE: {path}\n{'='*80}\n\n{block}"
-                self._write_chunk(big_block_data.encode("utf-8"), chunk_index)
-                chunk_index += 1
+                pieces.append(("text", big_block_data))
                 continue
 
             if current_count + block_size > self.max_chunk_size and current_lines:
                 chunk_data = "\n\n".join(current_lines)
                 final_text = f"{'='*80}\nFILE: {path}\n{'='*80}\n\n{chunk_data}"
-                self._write_chunk(final_text.encode("utf-8"), chunk_index)
-                chunk_index += 1
+                pieces.append(("text", final_text))
 
                 current_lines = []
                 current_count = 0
@@ -802,13 +1837,13 @@ class ParallelChunker:
         if current_lines:
             chunk_data = "\n\n".join(current_lines)
             final_text = f"{'='*80}\nFILE: {path}\n{'='*80}\n\n{chunk_data}"
-            self._write_chunk(final_text.encode("utf-8"), chunk_index)
-            chunk_index += 1
+            pieces.append(("text", final_text))
 
-        return chunk_index
+        return pieces
 
     def close(self):
-        pass
+        if self.transform_cache is not None:
+            self.transform_cache.close()
 
     def __enter__(self):
         return self
@@ -0,0 +1,539 @@
+import functools
+import itertools
+import os
+import re
+
+GLOB_CHARS = frozenset("*?[")
+IGNORE_FILENAMES = (".gitignore", ".pykomodo-ignore")
+
+_CASE_INSENSITIVE = os.path.normcase("A") != "A"
+_FLAGS = re.DOTALL | (re.IGNORECASE if _CASE_INSENSITIVE else 0)
+
+
+def _fold(s):
+    if _CASE_INSENSITIVE:
+        return s.lower()
+    return s
+
+
+def is_absolute_pattern(pattern):
+    if pattern.startswith("/"):
+        return True
+    if re.match(r"^[a-zA-Z]:\\", pattern):
+        return True
+    return False
+
+
+def is_literal(pattern):
+    return not any(c in GLOB_CHARS for c in pattern)
+
+
+def translate_glob(pattern, segment=False):
+    if segment:
+        star, one, neg = "[^/]*", "[^/]", "^/"
+    else:
+        star, one, neg = ".*", ".", "^"
+
+    res = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            while i < n and pattern[i] == "*":
+                i += 1
+            res.append(star)
+        elif c == "?":
+            res.append(one)
+        elif c == "[":
+            j = i
+            if j < n and pattern[j] == "!":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                res.append("\\[")
+                continue
+            stuff = pattern[i:j].replace("\\", "\\\\")
+            stuff = re.sub(r"([&~|\[])", r"\\\1", stuff)
+            i = j + 1
+            if stuff.startswith("!"):
+                stuff = neg + stuff[1:]
+            elif stuff.startswith("^"):
+                stuff = "\\" + stuff
+            res.append(f"[{stuff}]")
+        else:
+            res.append(re.escape(c))
+    return "".join(res)
+
+
+def translate_double_star(pattern):
+    units = []
+    for seg in pattern.split("/"):
+        if seg == "**":
+            units.append("(?:[^/]*/)*")
+        else:
+            units.append(translate_glob(seg, segment=True) + "/")
+    return "".join(units)
+
+
+def translate_gitignore(pattern):
+    segs = pattern.split("/")
+    units = []
+    for idx, seg in enumerate(segs):
+        if seg == "**":
+            if idx == len(segs) - 1:
+                units.append("(?:[^/]*/)+")
+            else:
+                units.append("(?:[^/]*/)*")
+        else:
+            units.append(translate_glob(seg, segment=True) + "/")
+    return "".join(units)
+
+
+def parse_ignore_line(line):
+    line = line.rstrip("\r\n")
+    if not line or line.startswith("#"):
+        return None
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped = stripped[:-1] + " "
+    line = stripped
+    negated = False
+    if line.startswith("!"):
+        negated = True
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    if "/" in line:
+        line = line.lstrip("/")
+    else:
+        line = "**/" + line
+    return negated, dir_only, line
+
+
+def parse_pattern_line(line):
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.endswith("/"):
+        line = line.rstrip("/")
+        if not line:
+            return None
+        if "/" not in line:
+            line = "**/" + line
+        line += "/**"
+    return line
+
+
+def _all_double_star(segs):
+    return all(seg == "**" for seg in segs)
+
+
+class DoubleStarAutomaton:
+    def __init__(self, patterns):
+        self.patterns = [tuple(p.split("/")) for p in patterns]
+        self._seg_re = {}
+        for i, segs in enumerate(self.patterns):
+            for j, seg in enumerate(segs):
+                if seg != "**":
+                    self._seg_re[(i, j)] = re.compile(translate_glob(seg, segment=True), _FLAGS)
+        self._advance_cache = {}
+        self.start = self._closure((i, 0) for i in range(len(self.patterns)))
+
+    def _closure(self, states):
+        out = set()
+        stack = list(states)
+        while stack:
+            state = stack.pop()
+            if state in out:
+                continue
+            out.add(state)
+            i, j = state
+            segs = self.patterns[i]
+            if j < len(segs) and segs[j] == "**":
+                stack.append((i, j + 1))
+        return frozenset(out)
+
+    def advance(self, states, segment):
+        key = (states, segment)
+        cached = self._advance_cache.get(key)
+        if cached is not None:
+            return cached
+        nxt = []
+        for i, j in states:
+            segs = self.patterns[i]
+            if j == len(segs):
+                continue
+            if segs[j] == "**":
+                nxt.append((i, j))
+            elif self._seg_re[(i, j)].fullmatch(segment):
+                nxt.append((i, j + 1))
+        result = self._closure(nxt)
+        self._advance_cache[key] = result
+        return result
+
+    def advance_all(self, states, segments):
+        for segment in segments:
+            if not states:
+                break
+            states = self.advance(states, segment)
+        return states
+
+    def residual(self, states):
+        always = False
+        globs = set()
+        for i, j in states:
+            segs = self.patterns[i]
+            if j == len(segs) or not _all_double_star(segs[j + 1:]):
+                continue
+            if segs[j] == "**":
+                always = True
+            else:
+                globs.add(segs[j])
+        return always, frozenset(globs)
+
+
+def _compile_any(regexes):
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{r})" for r in regexes), _FLAGS)
+
+
+class PatternSet:
+    def __init__(self, patterns, basename_only=False):
+        self.patterns = tuple(patterns)
+        self.basename_only = basename_only
+
+        self._base_names = set()
+        self._base_suffixes = []
+        self._seg_names = set()
+        self._seg_suffixes = []
+        self._dir_names = set()
+        self._flat_count = 0
+        self._residuals = {}
+
+        rel_regexes = []
+        rel_ds_patterns = []
+        abs_ds_patterns = []
+        rel_ds_regexes = []
+        abs_regexes = []
+        abs_ds_regexes = []
+        base_regexes = []
+
+        for pat in self.patterns:
+            if basename_only:
+                self._add_basename_pattern(pat, base_regexes)
+                continue
+
+            absolute = is_absolute_pattern(pat)
+            if "**" in pat:
+                norm = pat.replace("\\", "/")
+                if absolute:
+                    abs_ds_patterns.append(norm)
+                    abs_ds_regexes.append(translate_double_star(norm))
+                else:
+                    rel_ds_patterns.append(norm)
+                    if not self._add_double_star_bucket(norm):
+                        rel_ds_regexes.append(translate_double_star(norm))
+                if not absolute and "/" not in pat:
+                    base_regexes.append(translate_glob(pat))
+                    self._flat_count += 1
+                continue
+
+            self._flat_count += 1
+            if absolute:
+                abs_regexes.append(translate_glob(pat))
+            elif "/" in pat:
+                rel_regexes.append(translate_glob(pat))
+            elif not self._add_basename_bucket(pat):
+                rel_regexes.append(translate_glob(pat))
+                base_regexes.append(translate_glob(pat))
+
+        self._base_suffixes = tuple(self._base_suffixes)
+        self._seg_suffixes = tuple(self._seg_suffixes)
+        self._rel_re = _compile_any(rel_regexes)
+        self._rel_ds_re = _compile_any(rel_ds_regexes)
+        self._abs_re = _compile_any(abs_regexes)
+        self._abs_ds_re = _compile_any(abs_ds_regexes)
+        self._base_re = _compile_any(base_regexes)
+        self._rel_automaton = DoubleStarAutomaton(rel_ds_patterns)
+        self._abs_automaton = DoubleStarAutomaton(abs_ds_patterns)
+
+    def _add_basename_bucket(self, pat):
+        if is_literal(pat):
+            self._base_names.add(_fold(pat))
+            return True
+        if pat.startswith("*") and len(pat) > 1 and is_literal(pat[1:]):
+            self._base_suffixes.append(_fold(pat[1:]))
+            return True
+        return False
+
+    def _add_basename_pattern(self, pat, base_regexes):
+        if not self._add_basename_bucket(pat):
+            base_regexes.append(translate_glob(pat))
+
+    def _add_double_star_bucket(self, pat):
+        segs = pat.split("/")
+        if len(segs) == 2 and segs[0] == "**" and segs[1]:
+            last = segs[1]
+            if is_literal(last):
+                self._seg_names.add(_fold(last))
+                return True
+            if last.startswith("*") and len(last) > 1 and is_literal(last[1:]):
+                self._seg_suffixes.append(_fold(last[1:]))
+                return True
+        if len(segs) == 3 and segs[0] == "**" and segs[2] == "**" and segs[1]:
+            if is_literal(segs[1]):
+                self._dir_names.add(_fold(segs[1]))
+                return True
+        return False
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def match_basename(self, basename):
+        name = _fold(basename)
+        if name in self._base_names:
+            return True
+        if self._base_suffixes and name.endswith(self._base_suffixes):
+            return True
+        if self._base_re is not None and self._base_re.fullmatch(basename):
+            return True
+        return False
+
+    def match(self, abs_path, rel_path):
+        if self.basename_only:
+            return self.match_basename(os.path.basename(abs_path))
+
+        if self.match_basename(os.path.basename(abs_path)):
+            return True
+
+        if self._seg_names or self._seg_suffixes:
+            last = _fold(rel_path.rsplit("/", 1)[-1])
+            if last in self._seg_names:
+                return True
+            if self._seg_suffixes and last.endswith(self._seg_suffixes):
+                return True
+
+        if self._dir_names:
+            if not self._dir_names.isdisjoint(_fold(rel_path).split("/")):
+                return True
+
+        if self._rel_re is not None and self._rel_re.fullmatch(rel_path):
+            return True
+        if self._rel_ds_re is not None and self._rel_ds_re.fullmatch(rel_path + "/"):
+            return True
+        if self._abs_re is not None and self._abs_re.fullmatch(abs_path):
+            return True
+        if self._abs_ds_re is not None:
+            norm = abs_path.replace("\\", "/")
+            if self._abs_ds_re.fullmatch(norm + "/"):
+                return True
+        return False
+
+    def residual_set(self, globs):
+        residual = self._residuals.get(globs)
+        if residual is None:
+            residual = PatternSet(sorted(globs), basename_only=True)
+            self._residuals[globs] = residual
+        return residual
+
+    def directory(self, abs_dir):
+        abs_segs = abs_dir.replace("\\", "/").rstrip("/").split("/")
+        abs_states = self._abs_automaton.advance_all(self._abs_automaton.start, abs_segs)
+        return DirectoryPatterns(self, abs_dir, "", self._rel_automaton.start, abs_states)
+
+
+class DirectoryPatterns:
+    def __init__(self, pattern_set, abs_dir, rel_prefix, rel_states, abs_states):
+        self.pattern_set = pattern_set
+        self.abs_dir = abs_dir
+        self.rel_prefix = rel_prefix
+        self.rel_states = rel_states
+        self.abs_states = abs_states
+
+        rel_always, rel_globs = pattern_set._rel_automaton.residual(rel_states)
+        abs_always, abs_globs = pattern_set._abs_automaton.residual(abs_states)
+        self.always = rel_always or abs_always
+        globs = rel_globs | abs_globs
+        self.residual = pattern_set.residual_set(globs) if globs else None
+
+        if self.always:
+            self.settled = True
+        elif self.residual is None and not pattern_set._flat_count:
+            self.settled = False
+        else:
+            self.settled = None
+        if self.settled is None:
+            self.checks = len(globs) + pattern_set._flat_count
+        else:
+            self.checks = 0
+
+    def child(self, name):
+        ps = self.pattern_set
+        return DirectoryPatterns(
+            ps,
+            os.path.join(self.abs_dir, name),
+            self.rel_prefix + name + "/",
+            ps._rel_automaton.advance(self.rel_states, name) if self.rel_states else self.rel_states,
+            ps._abs_automaton.advance(self.abs_states, name) if self.abs_states else self.abs_states,
+        )
+
+    def match(self, name):
+        if self.settled is not None:
+            return self.settled
+        if self.residual is not None and self.residual.match_basename(name):
+            return True
+        ps = self.pattern_set
+        if ps.match_basename(name):
+            return True
+        if ps._rel_re is not None and ps._rel_re.fullmatch(self.rel_prefix + name):
+            return True
+        if ps._abs_re is not None and ps._abs_re.fullmatch(os.path.join(self.abs_dir, name)):
+            return True
+        return False
+
+
+class IgnoreFileRules:
+    def __init__(self, rules, prefix="", patterns=()):
+        self.rules = list(rules)
+        self.prefix = prefix
+        self.patterns = PatternSet(patterns)
+        self._runs = []
+        for negated, group in itertools.groupby(self.rules, key=lambda rule: rule[0]):
+            group = list(group)
+            any_re = _compile_any([translate_gitignore(pat) for _, dir_only, pat in group if not dir_only])
+            dir_re = _compile_any([translate_gitignore(pat) for _, dir_only, pat in group if dir_only])
+            self._runs.append((negated, any_re, dir_re))
+        self._runs.reverse()
+
+    @classmethod
+    def from_lines(cls, lines, prefix="", pattern_lines=()):
+        rules = []
+        for line in lines:
+            rule = parse_ignore_line(line)
+            if rule:
+                rules.append(rule)
+        patterns = []
+        for line in pattern_lines:
+            pattern = parse_pattern_line(line)
+            if pattern:
+                patterns.append(pattern)
+        return cls(rules, prefix, patterns)
+
+    def __bool__(self):
+        return bool(self.rules) or bool(self.patterns)
+
+    def match_patterns(self, abs_path, rel_path):
+        if not self.patterns:
+            return False
+        return self.patterns.match(abs_path, rel_path[len(self.prefix):])
+
+    def match(self, rel_path, is_dir=False):
+        target = rel_path[len(self.prefix):] + "/"
+        for negated, any_re, dir_re in self._runs:
+            if any_re is not None and any_re.fullmatch(target):
+                return not negated
+            if is_dir and dir_re is not None and dir_re.fullmatch(target):
+                return not negated
+        return None
+
+
+class IgnoreMatcher:
+    def __init__(self, ignore_patterns, unignore_patterns):
+        self.ignore = PatternSet(ignore_patterns)
+        self.unignore = PatternSet(unignore_patterns)
+
+    def should_ignore(self, abs_path, rel_path):
+        if not self.ignore.match(abs_path, rel_path):
+            return False
+        return not self.unignore.match(abs_path, rel_path)
+
+    def directory(self, abs_dir):
+        return DirectoryIgnore(self.ignore.directory(abs_dir), self.unignore.directory(abs_dir))
+
+
+class DirectoryIgnore:
+    def __init__(self, ignore, unignore, scoped=()):
+        self.ignore = ignore
+        self.unignore = unignore
+        self.scoped = scoped
+        total = len(ignore.pattern_set.patterns) + len(unignore.pattern_set.patterns)
+
+        ignore_settled = ignore.settled
+        if ignore_settled is False and scoped:
+            ignore_settled = None
+
+        if ignore_settled is False or unignore.settled is True:
+            self.settled = False
+        elif ignore_settled is True and unignore.settled is not None:
+            self.settled = not unignore.settled
+        else:
+            self.settled = None
+
+        if self.settled is None:
+            self.checks_avoided = total - ignore.checks - unignore.checks
+        else:
+            self.checks_avoided = total
+
+    def child(self, name):
+        return DirectoryIgnore(self.ignore.child(name), self.unignore.child(name), self.scoped)
+
+    def with_rules(self, rules):
+        return DirectoryIgnore(self.ignore, self.unignore, self.scoped + (rules,))
+
+    def _match_scoped(self, name, is_dir):
+        rel_path = self.ignore.rel_prefix + name
+        abs_path = os.path.join(self.ignore.abs_dir, name)
+        result = None
+        for rules in reversed(self.scoped):
+            if rules.match_patterns(abs_path, rel_path):
+                return True
+            if result is None:
+                result = rules.match(rel_path, is_dir)
+        return bool(result)
+
+    def should_ignore(self, name, is_dir=False):
+        if self.settled is not None:
+            return self.settled
+        if not self.ignore.match(name) and not (self.scoped and self._match_scoped(name, is_dir)):
+            return False
+        return not self.unignore.match(name)
+
+
+class PriorityMatcher:
+    def __init__(self, rules):
+        by_score = {}
+        for pattern, score in rules:
+            by_score.setdefault(score, []).append(pattern)
+        self._tiers = []
+        for score in sorted(by_score, reverse=True):
+            if score <= 0:
+                break
+            self._tiers.append((score, PatternSet(by_score[score], basename_only=True)))
+
+    def priority(self, path):
+        if not self._tiers:
+            return 0
+        basename = os.path.basename(path)
+        for score, patterns in self._tiers:
+            if patterns.match_basename(basename):
+                return score
+        return 0
+
+
+@functools.lru_cache(maxsize=32)
+def compile_ignore_matcher(ignore_patterns, unignore_patterns):
+    return IgnoreMatcher(ignore_patterns, unignore_patterns)
+
+
+@functools.lru_cache(maxsize=32)
+def compile_priority_matcher(rules):
+    return PriorityMatcher(rules)
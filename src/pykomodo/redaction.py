@@ -0,0 +1,269 @@
+import collections
+import math
+import os
+import re
+
+REDACTED_LINE = "[API_KEY_REDACTED]"
+# Bump whenever detector logic changes in a way the regexes and detector
+# settings below do not capture, so cached redactions are recomputed.
+REDACTION_VERSION = "2"
+TOKEN_RUN = re.compile(r"[a-zA-Z0-9_-]{20}")
+
+KEY_PREFIXES = re.compile(
+    r"(?<![A-Za-z0-9_-])(?:"
+    r"sk-(?:proj-|ant-)?[A-Za-z0-9_-]{20,}"
+    r"|[spr]k_(?:live|test)_[A-Za-z0-9]{16,}"
+    r"|(?:AKIA|ASIA)[0-9A-Z]{16}"
+    r"|gh[pousr]_[A-Za-z0-9]{36,}"
+    r"|github_pat_[A-Za-z0-9_]{22,}"
+    r"|glpat-[A-Za-z0-9_-]{20,}"
+    r"|xox[abprs]-[A-Za-z0-9-]{10,}"
+    r"|AIza[0-9A-Za-z_-]{35}"
+    r"|hf_[A-Za-z0-9]{30,}"
+    r"|npm_[A-Za-z0-9]{36}"
+    r"|-----BEGIN [A-Z ]*PRIVATE KEY-----"
+    r")"
+)
+SECRET_KEYWORD = re.compile(r"(?i)api[_-]?key|secret|token|passw(?:or)?d|credential|private[_-]?key")
+NAME_TAIL = re.compile(r"[\w.-]*")
+QUOTED_VALUE = re.compile(r"""['"]?\s*[:=]\s*(['"])[^'"\s]{8,}\1""")
+BARE_VALUE = re.compile(r"""['"]?\s*[:=]\s*[^\s'"#]{8,}""")
+LONG_TOKEN = re.compile(r"[A-Za-z0-9_-]{20,}")
+ENTROPY_CANDIDATE = re.compile(r"[A-Za-z0-9+/_-]{20,}={0,2}")
+HEX_ONLY = re.compile(r"[0-9a-fA-F]+")
+HAS_DIGIT = re.compile(r"[0-9]")
+HAS_LETTER = re.compile(r"[A-Za-z]")
+
+
+def _config_value(value):
+    if isinstance(value, re.Pattern):
+        return f"re({value.pattern!r}, {value.flags})"
+    return repr(value)
+
+
+def _patterns_fingerprint():
+    return ",".join(f"{name}={_config_value(value)}"
+                    for name, value in sorted(globals().items())
+                    if isinstance(value, re.Pattern))
+
+
+def _quote_bounds(line):
+    single = line.find("'")
+    double = line.find('"')
+    if single == -1:
+        first = double
+    elif double == -1:
+        first = single
+    else:
+        first = min(single, double)
+    if first == -1:
+        return None
+    last = max(line.rfind("'"), line.rfind('"'))
+    if last - first <= 20:
+        return None
+    return first, last
+
+
+def contains_quoted_token(line):
+    bounds = _quote_bounds(line)
+    if bounds is None:
+        return False
+    return TOKEN_RUN.search(line, bounds[0] + 1, bounds[1]) is not None
+
+
+def shannon_entropy(token):
+    n = len(token)
+    return -sum(c / n * math.log2(c / n) for c in collections.Counter(token).values())
+
+
+class QuotedTokenDetector:
+    name = "quoted_token"
+
+    def prefilter(self, text):
+        return "'" in text or '"' in text
+
+    def find(self, lines):
+        return [i for i, line in enumerate(lines) if contains_quoted_token(line)]
+
+
+class KeyPrefixDetector:
+    name = "key_prefix"
+
+    def __init__(self, pattern=KEY_PREFIXES):
+        self.pattern = pattern
+
+    def prefilter(self, text):
+        return self.pattern.search(text) is not None
+
+    def find(self, lines):
+        search = self.pattern.search
+        return [i for i, line in enumerate(lines) if search(line)]
+
+
+class KeywordDetector:
+    def __init__(self, name="keyword", bare_values=False):
+        self.name = name
+        self.value = BARE_VALUE if bare_values else QUOTED_VALUE
+
+    def prefilter(self, text):
+        return SECRET_KEYWORD.search(text) is not None
+
+    def find(self, lines):
+        return [i for i, line in enumerate(lines)
+                if SECRET_KEYWORD.search(line) and self._matches(line)]
+
+    def _matches(self, line):
+        pos = 0
+        while True:
+            hit = SECRET_KEYWORD.search(line, pos)
+            if hit is None:
+                break
+            end = NAME_TAIL.match(line, hit.end()).end()
+            if self.value.match(line, end):
+                return True
+            pos = end
+        bounds = _quote_bounds(line)
+        if bounds is None:
+            return False
+        for run in LONG_TOKEN.finditer(line, bounds[0] + 1, bounds[1]):
+            if SECRET_KEYWORD.search(run.group()):
+                return True
+        return False
+
+
+class EntropyDetector:
+    name = "entropy"
+
+    def __init__(self, threshold=4.0, relative=0.85):
+        self.threshold = threshold
+        self.relative = relative
+
+    def prefilter(self, text):
+        return ENTROPY_CANDIDATE.search(text) is not None
+
+    def _plausible(self, token):
+        return (HAS_DIGIT.search(token) is not None
+                and HAS_LETTER.search(token) is not None
+                and HEX_ONLY.fullmatch(token) is None)
+
+    def find(self, lines):
+        candidates = {}
+        for i, line in enumerate(lines):
+            for token in ENTROPY_CANDIDATE.findall(line):
+                if token in candidates:
+                    candidates[token].append(i)
+                elif self._plausible(token):
+                    candidates[token] = [i]
+        hits = set()
+        for token, indices in candidates.items():
+            limit = min(self.threshold, self.relative * math.log2(len(token)))
+            if shannon_entropy(token) >= limit:
+                hits.update(indices)
+        return hits
+
+
+DETECTORS = {}
+
+
+def register_detector(detector):
+    DETECTORS[detector.name] = detector
+    return detector
+
+
+register_detector(QuotedTokenDetector())
+register_detector(KeyPrefixDetector())
+register_detector(KeywordDetector())
+register_detector(KeywordDetector("env_assignment", bare_values=True))
+register_detector(EntropyDetector())
+
+DEFAULT_DETECTORS = ("key_prefix", "keyword", "entropy")
+CONFIG_DETECTORS = ("key_prefix", "keyword", "env_assignment", "entropy")
+
+LOCKFILE_NAMES = frozenset([
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+    "poetry.lock", "pipfile.lock", "uv.lock", "cargo.lock", "composer.lock",
+    "gemfile.lock", "go.sum", "flake.lock",
+])
+
+DEFAULT_ACTIVATION = {
+    "md": (), "markdown": (), "rst": (), "adoc": (), "lock": (), "sum": (), "svg": (),
+    "env": CONFIG_DETECTORS, "ini": CONFIG_DETECTORS, "cfg": CONFIG_DETECTORS,
+    "conf": CONFIG_DETECTORS, "toml": CONFIG_DETECTORS, "yaml": CONFIG_DETECTORS,
+    "yml": CONFIG_DETECTORS, "properties": CONFIG_DETECTORS, "json": CONFIG_DETECTORS,
+    "tfvars": CONFIG_DETECTORS,
+}
+
+
+class SecretRedactor:
+    def __init__(self, activation=None, default=DEFAULT_DETECTORS):
+        self.activation = dict(DEFAULT_ACTIVATION if activation is None else activation)
+        self.default = tuple(default)
+        self._profiles = {}
+        self._fingerprints = {}
+
+    def fingerprint(self, path=None):
+        return self._profile_fingerprint(self.detector_names(path))
+
+    def config_fingerprint(self):
+        profiles = [f"*={self._profile_fingerprint(self.default)}",
+                    f".env={self._profile_fingerprint(CONFIG_DETECTORS)}"]
+        for ext, names in sorted(self.activation.items()):
+            profiles.append(f"{ext}={self._profile_fingerprint(tuple(names))}")
+        return "\n".join(profiles)
+
+    def _profile_fingerprint(self, names):
+        value = self._fingerprints.get(names)
+        if value is None:
+            parts = [REDACTION_VERSION, REDACTED_LINE, _patterns_fingerprint()]
+            for name in names:
+                detector = DETECTORS[name]
+                config = sorted((k, _config_value(v)) for k, v in vars(detector).items())
+                parts.append(f"{detector.name}:{type(detector).__qualname__}:{config}")
+            value = "|".join(parts)
+            self._fingerprints[names] = value
+        return value
+
+    def detector_names(self, path=None):
+        if path is None:
+            return self.default
+        name = os.path.basename(path).lower()
+        if name in LOCKFILE_NAMES:
+            return ()
+        if name.startswith(".env"):
+            return CONFIG_DETECTORS
+        ext = name.rsplit(".", 1)[-1] if "." in name else ""
+        return self.activation.get(ext, self.default)
+
+    def detectors_for(self, path=None):
+        names = self.detector_names(path)
+        detectors = self._profiles.get(names)
+        if detectors is None:
+            detectors = tuple(DETECTORS[n] for n in names)
+            self._profiles[names] = detectors
+        return detectors
+
+    def redact_lines(self, lines, path=None, text=None):
+        detectors = self.detectors_for(path)
+        if not detectors or not lines:
+            return 0
+        if text is None:
+            text = "\n".join(lines)
+        hits = set()
+        for detector in detectors:
+            if detector.prefilter(text):
+                hits.update(detector.find(lines))
+        for i in hits:
+            lines[i] = REDACTED_LINE
+        return len(hits)
+
+    def redact_text(self, text, path=None):
+        lines = text.splitlines()
+        count = self.redact_lines(lines, path, text)
+        return "\n".join(lines), count
+
+
+default_redactor = SecretRedactor()
+
+
+def redact_text(text, path=None):
+    return default_redactor.redact_text(text, path)
@@ -1,8 +1,6 @@
 from flask import Flask, render_template, request, jsonify
 import os
 from pykomodo.multi_dirs_chunker import ParallelChunker
-import concurrent.futures
-import types
 
 app = Flask(__name__, template_folder='template')
 
@@ -90,47 +88,12 @@ def api_process_files():
                 output_dir=output_dir
             )
         
-        def process_files(self, file_paths):
-            if file_paths:
-                first_file_dir = os.path.dirname(os.path.abspath(file_paths[0]))
-                self.current_walk_root = first_file_dir
-                self.tree_generator.reset()
-            
-            self.loaded_files.clear()
-            valid_files = []
-            for fp in file_paths:
-                if os.path.isfile(fp):
-                    valid_files.append(fp)
-
-            if not valid_files:
-                raise ValueError("No files found to process")
-            
-            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.num_threads or 4)
-            futures = []
-
-            for path in valid_files:
-                future = executor.submit(self._load_file_data, path)
-                futures.append((future, path))
-
-            for future, path in futures:
-                try:
-                    path, content, priority = future.result()
-                    if content and not self.is_binary_file(path):
-                        self.loaded_files.append((path, content, priority))
-                except Exception as e:
-                    print(f"Error processing {path}: {e}")
-
-            if not self.loaded_files:
-                raise ValueError("No files could be processed")
-            
-            self.loaded_files.sort(key=lambda f: f[2], reverse=True)
-            self.loaded_files.sort(key=lambda f: f[0]) 
-
-            self._process_chunks()
-        
-        chunker.process_files = types.MethodType(process_files, chunker)
-        
-        chunker.process_files(files)
+        valid_files = [fp for fp in files if os.path.isfile(fp)]
+        if not valid_files:
+            raise ValueError("No files found to process")
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(fp)) for fp in valid_files])
+        if not chunker.process_paths(valid_files, root=root, force_process=True):
+            raise ValueError("No files could be processed")
         
         output_files = []
         if os.path.exists(output_dir):
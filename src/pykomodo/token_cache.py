@@ -0,0 +1,130 @@
+import array
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from pykomodo.loader import content_hash
+
+TOKEN_CACHE_VERSION = "1"
+CACHE_FILENAME = "tokens.sqlite3"
+OFFSET_TYPECODE = "I"
+
+
+def text_hash(text):
+    return content_hash(text.encode("utf-8", "surrogatepass"))
+
+
+def token_key(content_hash, encoding_name):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(TOKEN_CACHE_VERSION.encode("ascii"))
+    h.update(b"\0")
+    h.update(content_hash.encode("ascii"))
+    h.update(b"\0")
+    h.update(encoding_name.encode("utf-8"))
+    return h.hexdigest()
+
+
+def pack_offsets(offsets):
+    return zlib.compress(array.array(OFFSET_TYPECODE, offsets).tobytes())
+
+
+def unpack_offsets(blob):
+    offsets = array.array(OFFSET_TYPECODE)
+    offsets.frombytes(zlib.decompress(blob))
+    return offsets
+
+
+class TokenCache:
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.path = os.path.join(directory, CACHE_FILENAME)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["_conn"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_counts ("
+                "key TEXT PRIMARY KEY, tokens INTEGER NOT NULL, offsets BLOB, "
+                "size INTEGER NOT NULL, used REAL NOT NULL)"
+            )
+            self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM token_counts").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key, offsets=False):
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT tokens, offsets FROM token_counts WHERE key = ?", (key,)).fetchone()
+                if row is None or (offsets and row[1] is None):
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE token_counts SET used = ? WHERE key = ?", (time.time(), key))
+            except sqlite3.Error:
+                self.misses += 1
+                return None
+            self.hits += 1
+        tokens, blob = row
+        return tokens, None if blob is None else unpack_offsets(blob)
+
+    def put(self, key, tokens, offsets=None):
+        blob = None if offsets is None else pack_offsets(offsets)
+        size = len(key) + (len(blob) if blob is not None else 0) + 32
+        with self._lock:
+            try:
+                conn = self._connect()
+                old = conn.execute("SELECT size FROM token_counts WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO token_counts (key, tokens, offsets, size, used) VALUES (?, ?, ?, ?, ?)",
+                    (key, tokens, blob, size, time.time()),
+                )
+                self._total += size - (old[0] if old else 0)
+                if self._total > self.max_bytes:
+                    self._evict(conn)
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, conn):
+        target = self.max_bytes * 9 // 10
+        self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM token_counts").fetchone()[0]
+        if self._total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM token_counts ORDER BY used"):
+            if self._total <= target:
+                break
+            doomed.append((key,))
+            self._total -= size
+        conn.executemany("DELETE FROM token_counts WHERE key = ?", doomed)
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM token_counts").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,9 +1,18 @@
 import os
 import ast
+import array
 import fitz  
+import itertools
 import re
-import tiktoken
+from pykomodo.loader import MMAP_THRESHOLD
 from pykomodo.multi_dirs_chunker import ParallelChunker
+from pykomodo.token_cache import OFFSET_TYPECODE, TokenCache, text_hash, token_key
+from pykomodo.token_estimate import TokenEstimator, extension_of, weighted_units
+from pykomodo.tokenization import line_token_counts, lines_text, load_encoding, word_token_counts
+
+TOKEN_BATCH_LINES = 4096
+TOKEN_BATCH_BYTES = 8 * 1024 * 1024
+TOKEN_CACHE_MIN_CHARS = 1024
 
 class TokenBasedChunker(ParallelChunker):
     def __init__(
@@ -20,7 +29,24 @@ class TokenBasedChunker(ParallelChunker):
         semantic_chunking = False,
         file_type = None,
         encoding_name = "cl100k_base",  
-        verbose = False
+        verbose = False,
+        stream = False,
+        max_inflight_bytes = 256 * 1024 * 1024,
+        mmap_threshold = MMAP_THRESHOLD,
+        executor = "thread",
+        two_phase = False,
+        transform_cache_dir = None,
+        transform_cache_max_bytes = 512 * 1024 * 1024,
+        incremental = False,
+        from_git_index = False,
+        git_untracked = False,
+        token_threads = None,
+        token_cache_dir = None,
+        token_cache_max_bytes = 512 * 1024 * 1024,
+        tokenizer_path = None,
+        estimate_tokens = False,
+        fit_by_bytes = False,
+        word_count_fallback = False
     ):
         super().__init__(
             equal_chunks=equal_chunks,
@@ -33,26 +59,212 @@ class TokenBasedChunker(ParallelChunker):
             num_threads=num_threads,
             dry_run=dry_run,
             semantic_chunking=semantic_chunking,
-            file_type=file_type
+            file_type=file_type,
+            stream=stream,
+            max_inflight_bytes=max_inflight_bytes,
+            mmap_threshold=mmap_threshold,
+            executor=executor,
+            two_phase=two_phase,
+            transform_cache_dir=transform_cache_dir,
+            transform_cache_max_bytes=transform_cache_max_bytes,
+            incremental=incremental,
+            from_git_index=from_git_index,
+            git_untracked=git_untracked
         )
         
         self.max_tokens_per_chunk = max_tokens_per_chunk
         self.encoding_name = encoding_name
+        self.token_threads = max(1, token_threads or num_threads or 1)
+        self.token_cache = None
+        if token_cache_dir:
+            self.token_cache = TokenCache(token_cache_dir, token_cache_max_bytes)
+        self.tokenizer_path = tokenizer_path
+        self.word_count_fallback = word_count_fallback
+        self.estimate_tokens = estimate_tokens
+        self.estimator = TokenEstimator() if estimate_tokens else None
+        self.estimate_stats = {"sampled_files": 0, "estimated_files": 0}
+        self.fit_by_bytes = fit_by_bytes
+        self.unread_files = 0
         self.verbose = verbose
-        
-        self.encoding = None
+        self._encoding = None
+        self._encoding_loaded = False
+
+    @property
+    def encoding(self):
+        if not self._encoding_loaded:
+            self._encoding = self._load_encoding()
+            self._encoding_loaded = True
+        return self._encoding
+
+    @encoding.setter
+    def encoding(self, value):
+        self._encoding = value
+        self._encoding_loaded = True
+
+    def _load_encoding(self):
         try:
-            self.encoding = tiktoken.get_encoding(encoding_name)
-            if verbose:
-                print(f"Using {encoding_name} tokenizer", flush=True)
+            encoding = load_encoding(self.encoding_name, self.tokenizer_path)
         except Exception as e:
-            print(f"Error initializing tokenizer: {e}. Falling back to word-splitting.")
+            if self.tokenizer_path:
+                raise ValueError(f"Could not load tokenizer {self.encoding_name!r} from {self.tokenizer_path}: {e}")
+            if not self.word_count_fallback:
+                raise ValueError(f"Could not load tokenizer {self.encoding_name!r}: {e}. Use --tokenizer-path "
+                                 "for exact counts offline, or --word-count-fallback to count words instead.")
+            print(f"[Warn] Could not load tokenizer {self.encoding_name!r}: {e}. Falling back to word-splitting.")
+            return None
+        if self.verbose:
+            print(f"Using {self.encoding_name} tokenizer", flush=True)
+        return encoding
     
+    def _plan_worker_config(self):
+        kwargs, state = super()._plan_worker_config()
+        kwargs["max_tokens_per_chunk"] = kwargs.pop("max_chunk_size")
+        kwargs.update(
+            encoding_name=self.encoding_name,
+            token_threads=self.token_threads,
+            tokenizer_path=self.tokenizer_path,
+            word_count_fallback=self.word_count_fallback,
+        )
+        state["token_cache"] = self.token_cache
+        if self._encoding_loaded:
+            state.update(_encoding=self._encoding, _encoding_loaded=True)
+        return kwargs, state
+
+    def _incremental_config(self):
+        config = super()._incremental_config()
+        config["encoding"] = self.encoding_name if self.encoding else None
+        config["estimate_tokens"] = self.estimate_tokens
+        return config
+
     def count_tokens(self, text):
-        if self.encoding:
-            return len(self.encoding.encode(text))
-        else:
+        if not self.encoding:
             return len(text.split())
+        key = self._token_key(text)
+        if key is not None:
+            cached = self.token_cache.get(key)
+            if cached is not None:
+                return cached[0]
+        count = len(self.encoding.encode(text))
+        if key is not None:
+            self.token_cache.put(key, count)
+        return count
+
+    def _token_key(self, text):
+        if self.token_cache is None or len(text) < TOKEN_CACHE_MIN_CHARS:
+            return None
+        return token_key(text_hash(text), self.encoding.name)
+
+    def _encode_batch(self, texts):
+        start = 0
+        while start < len(texts):
+            end = start
+            size = 0
+            while end < len(texts) and (end == start or size < TOKEN_BATCH_BYTES):
+                size += len(texts[end])
+                end += 1
+            yield from self.encoding.encode_ordinary_batch(texts[start:end], num_threads=self.token_threads)
+            start = end
+
+    def _count_tokens_batch(self, texts):
+        if not self.encoding:
+            return [len(text.split()) for text in texts]
+        keys = [self._token_key(text) for text in texts]
+        counts = []
+        for key in keys:
+            cached = self.token_cache.get(key) if key is not None else None
+            counts.append(cached[0] if cached is not None else None)
+        missing = [i for i, count in enumerate(counts) if count is None]
+        for i, tokens in zip(missing, self._encode_batch([texts[i] for i in missing])):
+            counts[i] = len(tokens)
+            if keys[i] is not None:
+                self.token_cache.put(keys[i], counts[i])
+        return counts
+
+    def _units(self, text, data):
+        return weighted_units(data if data is not None else text.encode("utf-8", "surrogatepass"))
+
+    def _sample_indexes(self, entries):
+        taken = {}
+        chosen = []
+        for i, (path, units) in enumerate(entries):
+            ext = extension_of(path)
+            if not units or self.estimator.calibrated(ext):
+                continue
+            if taken.get(ext, 0) < self.estimator.samples_needed(ext):
+                taken[ext] = taken.get(ext, 0) + 1
+                chosen.append(i)
+        return chosen
+
+    def _estimate_file_tokens(self, entries):
+        exts = [extension_of(path) for path, _, _ in entries]
+        units = [self._units(text, data) for _, text, data in entries]
+        counts = [None] * len(entries)
+        sampled = self._sample_indexes(list(zip((path for path, _, _ in entries), units)))
+        for i, count in zip(sampled, self._count_tokens_batch([entries[i][1] for i in sampled])):
+            counts[i] = count
+            self.estimator.add_sample(exts[i], units[i], count)
+        self.estimate_stats["sampled_files"] += len(sampled)
+        rest = [i for i, count in enumerate(counts) if count is None and not self.estimator.calibrated(exts[i])]
+        for i, count in zip(rest, self._count_tokens_batch([entries[i][1] for i in rest])):
+            counts[i] = count
+        for i, count in enumerate(counts):
+            if count is None:
+                counts[i] = round(self.estimator.estimate(exts[i], units[i]))
+                self.estimate_stats["estimated_files"] += 1
+        return counts
+
+    def _fits_unread(self, text):
+        # Every byte-level BPE token covers at least one UTF-8 byte.
+        size = len(text) if text.isascii() else len(text.encode("utf-8", "surrogatepass"))
+        return size <= self.max_tokens_per_chunk
+
+    def _cached_line_counts(self, key, line_count):
+        if key is None:
+            return None
+        cached = self.token_cache.get(key, offsets=True)
+        if cached is None or len(cached[1]) != line_count + 1:
+            return None
+        offsets = cached[1]
+        return [end - start for start, end in zip(offsets, offsets[1:])]
+
+    def _store_line_counts(self, key, counts):
+        if key is not None:
+            offsets = array.array(OFFSET_TYPECODE, itertools.accumulate(counts, initial=0))
+            self.token_cache.put(key, offsets[-1], offsets)
+
+    def _line_token_counts(self, lines):
+        if not self.encoding:
+            return [len(line.split()) for line in lines]
+        text = lines_text(lines)
+        key = self._token_key(text)
+        counts = self._cached_line_counts(key, len(lines))
+        if counts is None:
+            counts = line_token_counts(self.encoding, lines, self.encoding.encode_ordinary(text))
+            self._store_line_counts(key, counts)
+        return counts
+
+    def _line_batches(self, lines):
+        if isinstance(lines, list):
+            yield lines
+            return
+        batch = []
+        for line in lines:
+            if len(batch) >= TOKEN_BATCH_LINES and line.strip():
+                yield batch
+                batch = []
+            batch.append(line)
+        if batch:
+            yield batch
+
+    def _counted_lines(self, lines):
+        for batch in self._line_batches(lines):
+            yield from zip(batch, self._line_token_counts(batch))
+
+    def _word_token_counts(self, line):
+        if self.encoding:
+            return word_token_counts(self.encoding, line)
+        words = line.split()
+        return words, [1] * len(words)
     
     def _chunk_by_equal_parts(self) -> None:
         if not self.loaded_files:
@@ -64,7 +276,7 @@ class TokenBasedChunker(ParallelChunker):
         chunks = [[] for _ in range(self.equal_chunks)]
         chunk_token_counts = [0] * self.equal_chunks
         
-        text_blocks = []
+        texts = []
         for path, content_bytes, priority in self.loaded_files:
             if path.endswith(".pdf"):
                 try:
@@ -72,21 +284,22 @@ class TokenBasedChunker(ParallelChunker):
                     text = ""
                     for page in doc:
                         text += page.get_text("text")
-                    token_count = self.count_tokens(text)
-                    text_blocks.append((path, text, token_count))
+                    texts.append((path, text, None))
                 except:
                     if self.verbose:
                         print(f"Error extracting text from PDF {path}")
             else:
                 try:
-                    text = content_bytes.decode("utf-8", errors="replace")
-                    text = self._filter_api_keys(text)
-                    token_count = self.count_tokens(text)
-                    text_blocks.append((path, text, token_count))
+                    texts.append((path, self._transform_text(path, content_bytes), content_bytes))
                 except:
                     if self.verbose:
                         print(f"Error processing {path}")
         
+        if self.estimator is not None and self.encoding:
+            counts = self._estimate_file_tokens(texts)
+        else:
+            counts = self._count_tokens_batch([text for _, text, _ in texts])
+        text_blocks = [(path, text, count) for (path, text, _), count in zip(texts, counts)]
         text_blocks.sort(key=lambda x: -x[2])
         
         for path, text, tokens in text_blocks:
@@ -100,7 +313,7 @@ class TokenBasedChunker(ParallelChunker):
             
             tree_header = ""
             if i == 0 and hasattr(self, 'current_walk_root') and self.current_walk_root:
-                tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
+                tree_header = self._tree_header()
 
             chunk_text = tree_header + f"{'=' * 80}\nCHUNK {i + 1} OF {self.equal_chunks}\n{'=' * 80}\n\n"
 
@@ -121,158 +334,169 @@ class TokenBasedChunker(ParallelChunker):
         if self.verbose:
             print(f"Creating chunks with maximum {self.max_tokens_per_chunk} tokens per chunk")
         
-        chunk_index = 0
+        numbering = self._numbering
         
-        for path, content_bytes, _ in self.loaded_files:
-            if path.endswith(".pdf"):
-                chunk_index = self._chunk_pdf_file(path, chunk_index)
-                continue
-            
-            if self.semantic_chunking and path.endswith(".py"):
-                text = content_bytes.decode("utf-8", errors="replace")
-                text = self._filter_api_keys(text)
-                chunk_index = self._chunk_python_file_semantic(path, text, chunk_index)
+        with self._chunk_writes() as write:
+            for path, pieces in self._iter_plans("_plan_token_chunks"):
+                if pieces is None:
+                    start = numbering.block_start(path)
+                    numbering.end_block(path, self._chunk_pdf_file(path, start))
+                    continue
+                
+                for piece in pieces:
+                    write(self._write_token_chunk, path, piece, numbering.take(path))
+
+    def _iter_plans(self, method):
+        if method != "_plan_token_chunks" or not self.encoding or self.executor == "process":
+            yield from super()._iter_plans(method)
+            return
+        batch = []
+        size = 0
+        for item in self._iter_loaded_files():
+            path = item[0]
+            if (path.lower().endswith(".pdf") or self._is_mapped(item)
+                    or (self.semantic_chunking and path.endswith(".py"))):
+                yield from self._plan_token_batch(batch)
+                batch, size = [], 0
+                yield path, self._plan_token_chunks(item)
                 continue
-            
             try:
-                text = content_bytes.decode("utf-8", errors="replace")
-                text = self._filter_api_keys(text)
+                text = self._transform_text(path, item[1])
             except Exception as e:
                 if self.verbose:
                     print(f"Error decoding {path}: {e}")
-                continue
-            
-            lines = text.splitlines()
-            current_chunk_lines = []
-            current_tokens = 0
+                text = ""
+            fits = self.fit_by_bytes and self._fits_unread(text)
+            batch.append((path, text.splitlines(), fits))
+            size += len(text)
+            if size >= TOKEN_BATCH_BYTES:
+                yield from self._plan_token_batch(batch)
+                batch, size = [], 0
+        yield from self._plan_token_batch(batch)
+
+    def _plan_token_batch(self, batch):
+        if not batch:
+            return
+        counts = [None] * len(batch)
+        exact = [i for i, (_, _, fits) in enumerate(batch) if not fits]
+        for i, line_counts in zip(exact, self._exact_line_counts([batch[i][1] for i in exact])):
+            counts[i] = line_counts
+        for i, (path, lines, fits) in enumerate(batch):
+            if fits:
+                self.unread_files += 1
+                # The whole file fits in one chunk, so per-line counts never matter.
+                counts[i] = [0] * len(lines)
+            yield path, self._plan_token_lines(path, lines, counts[i])
+
+    def _exact_line_counts(self, line_lists):
+        texts = [lines_text(lines) for lines in line_lists]
+        keys = [self._token_key(text) for text in texts]
+        counts = [self._cached_line_counts(key, len(lines)) for key, lines in zip(keys, line_lists)]
+        missing = [i for i, line_counts in enumerate(counts) if line_counts is None]
+        for i, tokens in zip(missing, self._encode_batch([texts[i] for i in missing])):
+            counts[i] = line_token_counts(self.encoding, line_lists[i], tokens)
+            self._store_line_counts(keys[i], counts[i])
+        return counts
+
+    def _write_token_chunk(self, path, piece, chunk_index):
+        first_only, numbered, body = piece
+        tree_header = ""
+        if (chunk_index == 0 or not first_only) and self.current_walk_root:
+            tree_header = self._tree_header()
+
+        if numbered:
+            chunk_text = tree_header + f"{'=' * 80}\nCHUNK {chunk_index + 1}\n{'=' * 80}\n\n"
+            chunk_text += f"{'=' * 40}\nFile: {path}\n{'=' * 40}\n"
+        else:
+            chunk_text = tree_header + f"{'=' * 80}\nFILE: {path}\n{'=' * 80}\n\n"
+        chunk_text += body
+        
+        chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
+        with open(chunk_path, "w", encoding="utf-8") as f:
+            f.write(chunk_text)
+
+    def _plan_token_chunks(self, item):
+        path = item[0]
+        if path.endswith(".pdf"):
+            return None
+        
+        if self.semantic_chunking and path.endswith(".py"):
+            text = self._transform_text(path, item[1])
+            return self._plan_python_file_semantic(path, text)
+        
+        try:
+            lines = self._iter_text_lines(item) or []
+        except Exception as e:
+            if self.verbose:
+                print(f"Error decoding {path}: {e}")
+            return []
+        
+        return self._plan_token_lines(path, lines)
+
+    def _plan_token_lines(self, path, lines, counts=None):
+        current_chunk_lines = []
+        current_tokens = 0
+        counted = zip(lines, counts) if counts is not None else self._counted_lines(lines)
+        
+        for line, line_tokens in counted:
+            if current_tokens + line_tokens > self.max_tokens_per_chunk and current_chunk_lines:
+                yield True, True, "\n".join(current_chunk_lines) + "\n"
+                current_chunk_lines = []
+                current_tokens = 0
             
-            for line in lines:
-                line_tokens = self.count_tokens(line)
+            if line_tokens > self.max_tokens_per_chunk:
+                if self.verbose:
+                    print(f"Warning: Line in {path} exceeds token limit ({line_tokens} tokens)")
                 
-                if current_tokens + line_tokens > self.max_tokens_per_chunk and current_chunk_lines:
-                    tree_header = ""
-                    if chunk_index == 0 and hasattr(self, 'current_walk_root') and self.current_walk_root:
-                        tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-
-                    chunk_text = tree_header + f"{'=' * 80}\nCHUNK {chunk_index + 1}\n{'=' * 80}\n\n"
-                    chunk_text += f"{'=' * 40}\nFile: {path}\n{'=' * 40}\n"
-                    chunk_text += "\n".join(current_chunk_lines) + "\n"
-                    
-                    chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
-                    with open(chunk_path, "w", encoding="utf-8") as f:
-                        f.write(chunk_text)
-                    
-                    chunk_index += 1
+                if current_chunk_lines:
+                    yield False, True, "\n".join(current_chunk_lines) + "\n"
                     current_chunk_lines = []
                     current_tokens = 0
                 
-                if line_tokens > self.max_tokens_per_chunk:
-                    if self.verbose:
-                        print(f"Warning: Line in {path} exceeds token limit ({line_tokens} tokens)")
-                    
-                    if current_chunk_lines:
-                        tree_header = ""
-                        if hasattr(self, 'current_walk_root') and self.current_walk_root:
-                            tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-
-                        chunk_text = tree_header + f"{'=' * 80}\nCHUNK {chunk_index + 1}\n{'=' * 80}\n\n"
-
-                        chunk_text += f"{'=' * 40}\nFile: {path}\n{'=' * 40}\n"
-                        chunk_text += "\n".join(current_chunk_lines) + "\n"
-                        
-                        chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
-                        with open(chunk_path, "w", encoding="utf-8") as f:
-                            f.write(chunk_text)
-                        
-                        chunk_index += 1
-                        current_chunk_lines = []
-                        current_tokens = 0
-                    
-                    words = line.split()
-                    word_chunks = []
-                    current_word_chunk = []
-                    current_word_tokens = 0
-                    
-                    for word in words:
-                        word_tokens = self.count_tokens(word + ' ')
-                        if current_word_tokens + word_tokens > self.max_tokens_per_chunk:
-                            word_chunks.append(' '.join(current_word_chunk))
-                            current_word_chunk = [word]
-                            current_word_tokens = word_tokens
-                        else:
-                            current_word_chunk.append(word)
-                            current_word_tokens += word_tokens
-                    
-                    if current_word_chunk:
+                words, word_counts = self._word_token_counts(line)
+                word_chunks = []
+                current_word_chunk = []
+                current_word_tokens = 0
+                
+                for word, word_tokens in zip(words, word_counts):
+                    if current_word_tokens + word_tokens > self.max_tokens_per_chunk:
                         word_chunks.append(' '.join(current_word_chunk))
-                    
-                    for i, word_chunk in enumerate(word_chunks):
-                        tree_header = ""
-                        if hasattr(self, 'current_walk_root') and self.current_walk_root:
-                            tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-
-                        chunk_text = tree_header + f"{'=' * 80}\nCHUNK {chunk_index + 1}\n{'=' * 80}\n\n"
-
-                        chunk_text += f"{'=' * 40}\nFile: {path}\n{'=' * 40}\n"
-                        chunk_text += f"[Long line part {i+1}/{len(word_chunks)}]\n{word_chunk}\n"
-                        
-                        chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
-                        with open(chunk_path, "w", encoding="utf-8") as f:
-                            f.write(chunk_text)
-                        
-                        chunk_index += 1
-                    
-                    continue
+                        current_word_chunk = [word]
+                        current_word_tokens = word_tokens
+                    else:
+                        current_word_chunk.append(word)
+                        current_word_tokens += word_tokens
                 
-                if line.strip():
-                    current_chunk_lines.append(line)
-                    current_tokens += line_tokens
-            
-            if current_chunk_lines:
-                tree_header = ""
-                if hasattr(self, 'current_walk_root') and self.current_walk_root:
-                    tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-
-                chunk_text = tree_header + f"{'=' * 80}\nCHUNK {chunk_index + 1}\n{'=' * 80}\n\n"
-
-                chunk_text += f"{'=' * 40}\nFile: {path}\n{'=' * 40}\n"
-                chunk_text += "\n".join(current_chunk_lines) + "\n"
+                if current_word_chunk:
+                    word_chunks.append(' '.join(current_word_chunk))
                 
-                chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
-                with open(chunk_path, "w", encoding="utf-8") as f:
-                    f.write(chunk_text)
+                for i, word_chunk in enumerate(word_chunks):
+                    yield False, True, f"[Long line part {i+1}/{len(word_chunks)}]\n{word_chunk}\n"
                 
-                chunk_index += 1
+                continue
+            
+            if line.strip():
+                current_chunk_lines.append(line)
+                current_tokens += line_tokens
+        
+        if current_chunk_lines:
+            yield False, True, "\n".join(current_chunk_lines) + "\n"
     
-    def _chunk_python_file_semantic(self, path, text, chunk_index):
+    def _plan_python_file_semantic(self, path, text):
         try:
             tree = ast.parse(text, filename=path)
         except SyntaxError:
             if self.verbose:
                 print(f"Syntax error in {path}, falling back to token-based chunking")
             
+            pieces = []
             lines = text.splitlines()
             current_chunk_lines = []
             current_tokens = 0
             
-            for line in lines:
-                line_tokens = self.count_tokens(line)
-                
+            for line, line_tokens in self._counted_lines(lines):
                 if current_tokens + line_tokens > self.max_tokens_per_chunk and current_chunk_lines:
-                    tree_header = ""
-                    if hasattr(self, 'current_walk_root') and self.current_walk_root:
-                        tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-
-                    chunk_text = tree_header + f"{'=' * 80}\nCHUNK {chunk_index + 1}\n{'=' * 80}\n\n"
-
-                    chunk_text += f"{'=' * 40}\nFile: {path}\n{'=' * 40}\n"
-                    chunk_text += "\n".join(current_chunk_lines) + "\n"
-                    
-                    chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
-                    with open(chunk_path, "w", encoding="utf-8") as f:
-                        f.write(chunk_text)
-                    
-                    chunk_index += 1
+                    pieces.append((False, True, "\n".join(current_chunk_lines) + "\n"))
                     current_chunk_lines = []
                     current_tokens = 0
                 
@@ -280,22 +504,9 @@ class TokenBasedChunker(ParallelChunker):
                 current_tokens += line_tokens
             
             if current_chunk_lines:
-                tree_header = ""
-                if chunk_index == 0 and hasattr(self, 'current_walk_root') and self.current_walk_root:
-                    tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-
-                chunk_text = tree_header + f"{'=' * 80}\nCHUNK {chunk_index + 1}\n{'=' * 80}\n\n"
-
-                chunk_text += f"{'=' * 40}\nFile: {path}\n{'=' * 40}\n"
-                chunk_text += "\n".join(current_chunk_lines) + "\n"
-                
-                chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
-                with open(chunk_path, "w", encoding="utf-8") as f:
-                    f.write(chunk_text)
-                
-                chunk_index += 1
+                pieces.append((True, True, "\n".join(current_chunk_lines) + "\n"))
             
-            return chunk_index
+            return pieces
         
         nodes = []
         for node in tree.body:
@@ -342,6 +553,7 @@ class TokenBasedChunker(ParallelChunker):
                 'end': len(lines)
             })
         
+        pieces = []
         current_chunk_blocks = []
         current_tokens = 0
         
@@ -357,65 +569,25 @@ class TokenBasedChunker(ParallelChunker):
                     print(f"Warning: {block['type']} {block['name']} in {path} exceeds token limit ({block_tokens} tokens)")
                 
                 if current_chunk_blocks:
-
-                    tree_header = ""
-                    if hasattr(self, 'current_walk_root') and self.current_walk_root:
-                        tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-
-                    chunk_text = tree_header + f"{'=' * 80}\nFILE: {path}\n{'=' * 80}\n\n"
-
-                    chunk_text += "\n\n".join(current_chunk_blocks)
-                    
-                    chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
-                    with open(chunk_path, "w", encoding="utf-8") as f:
-                        f.write(chunk_text)
-                    
-                    chunk_index += 1
+                    pieces.append((False, False, "\n\n".join(current_chunk_blocks)))
                     current_chunk_blocks = []
                     current_tokens = 0
                 
-                chunk_text = tree_header + f"{'=' * 80}\nFILE: {path}\n{'=' * 80}\n\n{block_text}"                
-                chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
-                with open(chunk_path, "w", encoding="utf-8") as f:
-                    f.write(chunk_text)
-                
-                chunk_index += 1
+                pieces.append((False, False, block_text))
                 continue
             
-            tree_header = ""
-            if hasattr(self, 'current_walk_root') and self.current_walk_root:
-                tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-
             if current_tokens + block_tokens > self.max_tokens_per_chunk and current_chunk_blocks:
-                chunk_text = tree_header + f"{'=' * 80}\nFILE: {path}\n{'=' * 80}\n\n"
-                chunk_text += "\n\n".join(current_chunk_blocks)
-                
-                chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
-                with open(chunk_path, "w", encoding="utf-8") as f:
-                    f.write(chunk_text)
-                
-                chunk_index += 1
+                pieces.append((False, False, "\n\n".join(current_chunk_blocks)))
                 current_chunk_blocks = []
                 current_tokens = 0
             
             current_chunk_blocks.append(block_text)
             current_tokens += block_tokens
         
-        tree_header = ""
-        if hasattr(self, 'current_walk_root') and self.current_walk_root:
-            tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
-            
         if current_chunk_blocks:
-            chunk_text = tree_header + f"{'=' * 80}\nFILE: {path}\n{'=' * 80}\n\n"
-            chunk_text += "\n\n".join(current_chunk_blocks)
-            
-            chunk_path = os.path.join(self.output_dir, f"chunk-{chunk_index}.txt")
-            with open(chunk_path, "w", encoding="utf-8") as f:
-                f.write(chunk_text)
-            
-            chunk_index += 1
+            pieces.append((False, False, "\n\n".join(current_chunk_blocks)))
         
-        return chunk_index
+        return pieces
     
     def _chunk_pdf_file(self, path, chunk_index):
         try:
@@ -467,7 +639,7 @@ class TokenBasedChunker(ParallelChunker):
                 if current_tokens + para_tokens > self.max_tokens_per_chunk and current_chunk_paras:
                     tree_header = ""
                     if hasattr(self, 'current_walk_root') and self.current_walk_root:
-                        tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
+                        tree_header = self._tree_header()
 
                     chunk_text = tree_header + f"{'=' * 80}\nFILE: {path}\n{'=' * 80}\n\n"
                     chunk_text += "\n\n".join(current_chunk_paras)
@@ -485,7 +657,7 @@ class TokenBasedChunker(ParallelChunker):
             
             tree_header = ""
             if chunk_index == 0 and hasattr(self, 'current_walk_root') and self.current_walk_root:
-                tree_header = self.tree_generator.prepare_tree_header(self.current_walk_root)
+                tree_header = self._tree_header()
 
             if current_chunk_paras:
                 chunk_text = tree_header + f"{'=' * 80}\nFILE: {path}\n{'=' * 80}\n\n"
@@ -510,4 +682,9 @@ class TokenBasedChunker(ParallelChunker):
             with open(chunk_path, "w", encoding="utf-8") as f:
                 f.write(chunk_text)
             
-            return chunk_index + 1
\ No newline at end of file
+            return chunk_index + 1
+
+    def close(self):
+        super().close()
+        if self.token_cache is not None:
+            self.token_cache.close()
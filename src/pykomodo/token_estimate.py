@@ -0,0 +1,74 @@
+import os
+
+# Byte classes and their rough tokens-per-byte for BPE encodings. Only the
+# relative weights matter; each extension's scale is calibrated on exact counts.
+CLASS_WEIGHTS = (
+    0.22,  # ASCII letters
+    0.34,  # digits
+    0.10,  # spaces and tabs
+    0.50,  # line breaks
+    0.60,  # punctuation, symbols and control bytes
+    0.45,  # non-ASCII bytes
+)
+SAMPLE_FILES = 3
+
+def _class_table():
+    table = bytearray([4]) * 256
+    for b in range(256):
+        c = chr(b)
+        if b >= 0x80:
+            table[b] = 5
+        elif c.isalpha():
+            table[b] = 0
+        elif c.isdigit():
+            table[b] = 1
+        elif c in " \t\f\v":
+            table[b] = 2
+        elif c in "\r\n":
+            table[b] = 3
+    return bytes(table)
+
+
+CLASS_TABLE = _class_table()
+
+
+def byte_class_counts(data):
+    classes = data.translate(CLASS_TABLE)
+    return [classes.count(code) for code in range(len(CLASS_WEIGHTS))]
+
+
+def weighted_units(data):
+    return sum(w * n for w, n in zip(CLASS_WEIGHTS, byte_class_counts(data)))
+
+
+def extension_of(path):
+    return os.path.splitext(path)[1].lower()
+
+
+class TokenEstimator:
+    def __init__(self, sample_files=SAMPLE_FILES):
+        self.sample_files = sample_files
+        self._samples = {}
+
+    def calibrated(self, ext):
+        entry = self._samples.get(ext)
+        return entry is not None and entry["files"] >= self.sample_files
+
+    def samples_needed(self, ext):
+        entry = self._samples.get(ext)
+        return self.sample_files - (entry["files"] if entry else 0)
+
+    def add_sample(self, ext, units, tokens):
+        if not units:
+            return
+        entry = self._samples.setdefault(ext, {"files": 0, "tokens": 0, "units": 0.0})
+        entry["files"] += 1
+        entry["tokens"] += tokens
+        entry["units"] += units
+
+    def ratio(self, ext):
+        entry = self._samples[ext]
+        return entry["tokens"] / entry["units"]
+
+    def estimate(self, ext, units):
+        return units * self.ratio(ext)
@@ -0,0 +1,127 @@
+import bisect
+import hashlib
+import itertools
+import os
+import re
+import threading
+import types
+
+import tiktoken
+from tiktoken.load import load_tiktoken_bpe
+from tiktoken_ext.openai_public import ENCODING_CONSTRUCTORS
+
+WORD_RE = re.compile(r"\S+")
+RANKS_URL = "https://openaipublic.blob.core.windows.net/encodings/{}.tiktoken"
+
+_byte_lengths = {}
+_byte_lengths_lock = threading.Lock()
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def load_encoding(name, path=None):
+    key = (name, os.path.abspath(path) if path else None)
+    with _encodings_lock:
+        encoding = _encodings.get(key)
+        if encoding is None:
+            encoding = _load_encoding(name, path) if path else tiktoken.get_encoding(name)
+            _encodings[key] = encoding
+    return encoding
+
+
+def _ranks_cache_name(name):
+    return hashlib.sha1(RANKS_URL.format(name).encode()).hexdigest()
+
+
+def _ranks_file(name, path):
+    if os.path.isfile(path):
+        return path
+    if os.path.isdir(path):
+        for candidate in (f"{name}.tiktoken", _ranks_cache_name(name)):
+            ranks_file = os.path.join(path, candidate)
+            if os.path.isfile(ranks_file):
+                return ranks_file
+        raise ValueError(f"No {name}.tiktoken rank file or tiktoken cache entry in {path}")
+    raise ValueError(f"Tokenizer path does not exist: {path}")
+
+
+def _load_encoding(name, path):
+    constructor = ENCODING_CONSTRUCTORS.get(name)
+    if constructor is None:
+        raise ValueError(f"Unknown encoding {name!r}; expected one of {', '.join(ENCODING_CONSTRUCTORS)}")
+    ranks_file = _ranks_file(name, path)
+
+    def load_ranks(url, expected_hash=None):
+        return load_tiktoken_bpe(ranks_file, expected_hash)
+
+    def load_data_gym(**kwargs):
+        raise ValueError(f"{name} is not distributed as a .tiktoken rank file")
+
+    # The constructor supplies pat_str and special tokens; run a copy of it
+    # whose rank loader reads the local file instead of the download URL.
+    names = dict(constructor.__globals__, load_tiktoken_bpe=load_ranks,
+                 data_gym_to_mergeable_bpe_ranks=load_data_gym)
+    spec = types.FunctionType(constructor.__code__, names)()
+    return tiktoken.Encoding(**spec)
+
+
+def token_byte_lengths(encoding):
+    lengths = _byte_lengths.get(encoding.name)
+    if lengths is None:
+        with _byte_lengths_lock:
+            lengths = _byte_lengths.get(encoding.name)
+            if lengths is None:
+                lengths = []
+                for token in range(encoding.n_vocab):
+                    try:
+                        lengths.append(len(encoding.decode_single_token_bytes(token)))
+                    except KeyError:
+                        lengths.append(0)
+                _byte_lengths[encoding.name] = lengths
+    return lengths
+
+
+def split_token_counts(encoding, tokens, span_bytes):
+    lengths = token_byte_lengths(encoding)
+    starts = list(itertools.accumulate(map(lengths.__getitem__, tokens), initial=0))
+    starts.pop()
+    counts = []
+    previous = 0
+    offset = 0
+    for size in span_bytes:
+        offset += size
+        index = bisect.bisect_left(starts, offset)
+        counts.append(index - previous)
+        previous = index
+    return counts
+
+
+def line_byte_lengths(lines, ascii=False):
+    if ascii:
+        return [len(line) + 1 for line in lines]
+    return [len(line.encode("utf-8", "surrogatepass")) + 1 for line in lines]
+
+
+def lines_text(lines):
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def line_token_counts(encoding, lines, tokens=None):
+    if tokens is None:
+        tokens = encoding.encode_ordinary(lines_text(lines))
+    ascii = all(map(str.isascii, lines))
+    return split_token_counts(encoding, tokens, line_byte_lengths(lines, ascii))
+
+
+def word_token_counts(encoding, line):
+    matches = list(WORD_RE.finditer(line))
+    words = [m.group() for m in matches]
+    if not words:
+        return words, []
+    bounds = [0] + [m.start() for m in matches[1:]] + [len(line)]
+    if line.isascii():
+        spans = [end - start for start, end in zip(bounds, bounds[1:])]
+    else:
+        spans = [len(line[start:end].encode("utf-8", "surrogatepass"))
+                 for start, end in zip(bounds, bounds[1:])]
+    return words, split_token_counts(encoding, encoding.encode_ordinary(line), spans)
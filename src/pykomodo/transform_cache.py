@@ -0,0 +1,113 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+TRANSFORM_VERSION = "1"
+CACHE_FILENAME = "transforms.sqlite3"
+
+
+def transform_key(content_hash, fingerprint):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(TRANSFORM_VERSION.encode("ascii"))
+    h.update(b"\0")
+    h.update(content_hash.encode("ascii"))
+    h.update(b"\0")
+    h.update(fingerprint.encode("utf-8"))
+    return h.hexdigest()
+
+
+class TransformCache:
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.path = os.path.join(directory, CACHE_FILENAME)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["_conn"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS transforms ("
+                "key TEXT PRIMARY KEY, text BLOB, redactions INTEGER NOT NULL, "
+                "size INTEGER NOT NULL, used REAL NOT NULL)"
+            )
+            self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM transforms").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT text, redactions FROM transforms WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE transforms SET used = ? WHERE key = ?", (time.time(), key))
+            except sqlite3.Error:
+                self.misses += 1
+                return None
+            self.hits += 1
+        blob, redactions = row
+        text = None if blob is None else zlib.decompress(blob).decode("utf-8")
+        return text, redactions
+
+    def put(self, key, text, redactions):
+        blob = None if text is None else zlib.compress(text.encode("utf-8"))
+        size = len(key) + (len(blob) if blob is not None else 0) + 32
+        with self._lock:
+            try:
+                conn = self._connect()
+                old = conn.execute("SELECT size FROM transforms WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO transforms (key, text, redactions, size, used) VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, redactions, size, time.time()),
+                )
+                self._total += size - (old[0] if old else 0)
+                if self._total > self.max_bytes:
+                    self._evict(conn)
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, conn):
+        target = self.max_bytes * 9 // 10
+        self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM transforms").fetchone()[0]
+        if self._total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM transforms ORDER BY used"):
+            if self._total <= target:
+                break
+            doomed.append((key,))
+            self._total -= size
+        conn.executemany("DELETE FROM transforms WHERE key = ?", doomed)
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM transforms").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,6 +1,8 @@
 import io
+import os
 from contextlib import redirect_stdout
-from treeline.renderer import tree
+from pathlib import PurePosixPath
+from treeline.renderer import TreeRenderer, tree
 
 class TreeGenerator:
     def __init__(self):
@@ -23,9 +25,47 @@ class TreeGenerator:
         except Exception:
             return "[Tree structure not available]"
 
-    def prepare_tree_header(self, source_directory):
+    def generate_tree_from_paths(self, directory_path, paths, max_depth=3):
+        renderer = TreeRenderer(max_depth=max_depth, show_size=False, output_file=True)
+        root = {}
+        for path in paths:
+            node = root
+            parts = PurePosixPath(str(path).replace("\\", "/")).parts
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+                if node is None:
+                    break
+            else:
+                if parts:
+                    node.setdefault(parts[-1], None)
+
+        lines = [f"{os.path.basename(os.path.realpath(directory_path))}/"]
+
+        def render(node, prefix, depth):
+            if depth >= max_depth:
+                return
+            names = [n for n in node if not renderer.should_skip(PurePosixPath(n))]
+            dirs = sorted(n for n in names if node[n] is not None)
+            files = sorted(n for n in names if node[n] is None)
+            items = dirs + files
+            for i, name in enumerate(items):
+                is_last = i == len(items) - 1
+                current_prefix = "└── " if is_last else "├── "
+                if node[name] is None:
+                    lines.append(f"{prefix}{current_prefix}{name}")
+                else:
+                    lines.append(f"{prefix}{current_prefix}{name}/")
+                    render(node[name], prefix + ("    " if is_last else "│   "), depth + 1)
+
+        render(root, "", 0)
+        return "\n".join(lines) + "\n"
+
+    def prepare_tree_header(self, source_directory, paths=None):
         if self.tree_structure is None:
-            tree_content = self.generate_tree_structure(source_directory)
+            if paths is not None:
+                tree_content = self.generate_tree_from_paths(source_directory, paths)
+            else:
+                tree_content = self.generate_tree_structure(source_directory)
             self.tree_structure = tree_content
             
             self.tree_header = (
@@ -0,0 +1,151 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        if not sys.platform.startswith("linux"):
+            return None
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            return None
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc = libc
+    return _libc
+
+
+class InotifyWatcher:
+    def __init__(self):
+        libc = _load_libc()
+        if libc is None:
+            raise OSError("inotify is not available on this platform")
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._libc = libc
+        self.fd = fd
+        self._dirs = {}
+        self._watched = {}
+
+    def reset(self, files, directories):
+        for directory in directories:
+            if directory in self._watched:
+                continue
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+            self._dirs[wd] = directory
+            self._watched[directory] = wd
+
+    def wait(self, timeout):
+        changed = set()
+        rescan = False
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return changed, rescan
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    rescan = True
+                    continue
+                directory = self._dirs.get(wd)
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    self._watched.pop(directory, None)
+                    continue
+                if directory is None:
+                    continue
+                if mask & (IN_ISDIR | IN_DELETE_SELF | IN_MOVE_SELF):
+                    rescan = True
+                    continue
+                changed.add(os.path.join(directory, os.fsdecode(name)))
+        return changed, rescan
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class PollingWatcher:
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._files = {}
+        self._dirs = {}
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def reset(self, files, directories):
+        self._files = {path: self._stat(path) for path in files}
+        self._dirs = {path: self._stat(path) for path in directories}
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval) if timeout else self.interval)
+        rescan = False
+        for path, state in list(self._dirs.items()):
+            current = self._stat(path)
+            if current != state:
+                self._dirs[path] = current
+                rescan = True
+        changed = set()
+        for path, state in list(self._files.items()):
+            current = self._stat(path)
+            if current != state:
+                changed.add(path)
+                if current is None:
+                    del self._files[path]
+                else:
+                    self._files[path] = current
+        return changed, rescan
+
+    def close(self):
+        pass
+
+
+def open_watcher(use_inotify=True, interval=1.0):
+    if use_inotify:
+        try:
+            return InotifyWatcher()
+        except OSError:
+            pass
+    return PollingWatcher(interval)
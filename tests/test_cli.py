@@ -87,6 +87,25 @@ class TestCLIScript(unittest.TestCase):
                 mock_chunker.assert_called_once()
                 mock_instance.process_directories.assert_called_once()
 
+    def test_cache_cap_is_shared_by_token_caches(self):
+        from pykomodo.command_line import main
+
+        test_args = [
+            sys.argv[0],
+            self.test_dir,
+            '--max-tokens', '100',
+            '--cache-dir', os.path.join(self.test_dir, "cache"),
+            '--cache-max-mb', '64',
+            '--output-dir', self.output_dir
+        ]
+
+        with patch('sys.argv', test_args):
+            with patch('pykomodo.token_chunker.TokenBasedChunker') as mock_chunker:
+                main()
+                kwargs = mock_chunker.call_args.kwargs
+                self.assertEqual(kwargs["transform_cache_max_bytes"] + kwargs["token_cache_max_bytes"],
+                                 64 * 1024 * 1024)
+
     def test_priority_rules_cli(self):
         from pykomodo.command_line import main 
         
@@ -172,6 +191,20 @@ class TestCLIScript(unittest.TestCase):
                 self.assertEqual(call_args['context_window'], 2048)
                 self.assertEqual(call_args['min_relevance_score'], 0.5)
 
+    def test_enhanced_rejects_unsupported_options(self):
+        from pykomodo.command_line import main
+
+        for extra in (['--stream'], ['--executor', 'process'], ['--cache-dir', self.output_dir],
+                      ['--paths-from', '-'], ['--max-inflight-mb', '64']):
+            test_args = [sys.argv[0], self.test_dir, '--max-chunk-size', '100', '--enhanced'] + extra
+            with patch('sys.argv', test_args), patch('sys.stderr', new_callable=StringIO) as stderr:
+                with patch('pykomodo.enhanced_chunker.EnhancedParallelChunker') as mock_chunker:
+                    with self.assertRaises(SystemExit) as cm:
+                        main()
+                    mock_chunker.assert_not_called()
+            self.assertEqual(cm.exception.code, 2)
+            self.assertIn(f"--enhanced cannot be combined with {extra[0]}", stderr.getvalue())
+
     def test_semantic_chunks_cli(self):
         from pykomodo.command_line import main 
         
@@ -0,0 +1,143 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from pykomodo.git_index import find_work_tree, read_index
+from pykomodo.multi_dirs_chunker import ParallelChunker
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@unittest.skipUnless(shutil.which("git"), "git is not installed")
+class TestGitIndex(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        git(self.repo, "init", "-q")
+        files = {
+            "main.py": "print('hi')\n",
+            "src/app.py": "x = 1\n",
+            "src/deep/" + "long_name_" * 8 + ".txt": "deep\n",
+            "docs/guide.md": "# Guide\n",
+            "node_modules/pkg/index.js": "module.exports = 1\n",
+        }
+        for rel, text in files.items():
+            path = os.path.join(self.repo, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(text)
+        os.symlink("main.py", os.path.join(self.repo, "link.py"))
+        git(self.repo, "add", "-A")
+        with open(os.path.join(self.repo, ".gitignore"), "w") as f:
+            f.write("*.log\n")
+        with open(os.path.join(self.repo, "untracked.py"), "w") as f:
+            f.write("y = 2\n")
+        with open(os.path.join(self.repo, "debug.log"), "w") as f:
+            f.write("noise\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo)
+
+    def _ls_files(self):
+        out = []
+        for line in git(self.repo, "ls-files", "-s").splitlines():
+            mode, sha, _, path = line.split(None, 3)
+            if mode.startswith("100"):
+                out.append((path, sha))
+        return out
+
+    def test_read_index_versions(self):
+        for version in ("2", "3", "4"):
+            git(self.repo, "update-index", "--index-version", version)
+            entries = read_index(os.path.join(self.repo, ".git"))
+            self.assertEqual([(e.path, e.sha) for e in entries], self._ls_files())
+            self.assertNotIn("link.py", [e.path for e in entries])
+
+    def test_skip_worktree_entries_are_dropped(self):
+        git(self.repo, "update-index", "--skip-worktree", "main.py")
+        paths = [e.path for e in read_index(os.path.join(self.repo, ".git"))]
+        self.assertNotIn("main.py", paths)
+
+    def test_find_work_tree_from_subdirectory(self):
+        root, git_dir = find_work_tree(os.path.join(self.repo, "src", "deep"))
+        self.assertEqual(root, os.path.abspath(self.repo))
+        self.assertEqual(git_dir, os.path.join(root, ".git"))
+
+    def test_chunker_lists_tracked_files(self):
+        chunker = ParallelChunker(max_chunk_size=10, from_git_index=True, user_ignore=["docs/**"])
+        paths = chunker._collect_paths([os.path.join(self.repo, "")])
+        rel = sorted(os.path.relpath(p, self.repo) for p in paths)
+        self.assertEqual(rel, ["main.py", os.path.join("src", "app.py"),
+                               os.path.join("src", "deep", "long_name_" * 8 + ".txt")])
+
+    def test_ignore_files_apply_to_tracked_paths(self):
+        with open(os.path.join(self.repo, ".pykomodo-ignore"), "w") as f:
+            f.write("*.md\n")
+        with open(os.path.join(self.repo, "src", ".pykomodo-ignore"), "w") as f:
+            f.write("deep/\n")
+        walked = ParallelChunker(max_chunk_size=10)._collect_paths([self.repo])
+        indexed = ParallelChunker(max_chunk_size=10, from_git_index=True)._collect_paths([self.repo])
+        rel = sorted(os.path.relpath(p, self.repo) for p in indexed)
+        self.assertEqual(rel, ["main.py", os.path.join("src", "app.py")])
+        self.assertEqual(sorted(indexed), sorted(p for p in walked if p.endswith(("main.py", "app.py"))))
+        self.assertFalse([p for p in walked if p.endswith((".md", ".txt"))])
+
+    def test_clean_entries_reuse_blob_ids(self):
+        for rel in ("main.py", "src/app.py"):
+            os.utime(os.path.join(self.repo, rel), ns=(10 ** 18, 10 ** 18))
+        git(self.repo, "update-index", "--refresh")
+        with open(os.path.join(self.repo, "src", "app.py"), "a") as f:
+            f.write("y = 2\n")
+        blob_ids = dict(self._ls_files())
+        chunker = ParallelChunker(max_chunk_size=10, from_git_index=True)
+        paths = {os.path.relpath(p, self.repo): p for p in chunker._collect_paths([self.repo])}
+        self.assertEqual(chunker._load_file_record(paths["main.py"]).content_hash, blob_ids["main.py"])
+        chunker.mmap_threshold = 0
+        streamed = chunker._load_file_record(paths["main.py"])
+        self.assertEqual((streamed.size, streamed.content_hash), (12, blob_ids["main.py"]))
+        self.assertNotEqual(chunker._load_file_record(paths[os.path.join("src", "app.py")]).content_hash,
+                            blob_ids["src/app.py"])
+
+    def test_ignore_file_lookups_are_cached(self):
+        chunker = ParallelChunker(max_chunk_size=10, from_git_index=True)
+        chunker._collect_paths([self.repo])
+        rules = chunker._read_ignore_file(self.repo)
+        self.assertIsNotNone(rules)
+        with patch("builtins.open", side_effect=AssertionError("ignore file read twice")):
+            self.assertIs(chunker._read_ignore_file(os.path.join(self.repo, "src", "..")), rules)
+            self.assertIsNone(chunker._read_ignore_file(os.path.join(self.repo, "src")))
+
+    def test_untracked_files_are_optional(self):
+        chunker = ParallelChunker(max_chunk_size=10, from_git_index=True, git_untracked=True)
+        with patch.object(chunker, "_walk_paths", wraps=chunker._walk_paths) as walk:
+            rel = [os.path.relpath(p, self.repo) for p in chunker._collect_paths([self.repo])]
+        walk.assert_called_once()
+        self.assertIn("untracked.py", rel)
+        self.assertIn(".gitignore", rel)
+        self.assertNotIn("debug.log", rel)
+        self.assertEqual(len(rel), len(set(rel)))
+        tracked = [os.path.join(*path.split("/")) for path, _ in self._ls_files()
+                   if not path.startswith("node_modules/")]
+        self.assertEqual(rel[:len(tracked)], tracked)
+
+    def test_subdirectory_matches_walk(self):
+        src = os.path.join(self.repo, "src")
+        walked = ParallelChunker(max_chunk_size=10)._collect_paths([src])
+        indexed = ParallelChunker(max_chunk_size=10, from_git_index=True)._collect_paths([src])
+        self.assertEqual(sorted(indexed), sorted(walked))
+
+    def test_falls_back_to_walk_outside_git(self):
+        plain = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, plain)
+        with open(os.path.join(plain, "a.txt"), "w") as f:
+            f.write("a")
+        chunker = ParallelChunker(max_chunk_size=10, from_git_index=True)
+        self.assertEqual(chunker._collect_paths([plain]), [os.path.join(plain, "a.txt")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from pykomodo.git_objects import CatFileBatch, changed_ranges, list_tree, resolve_range
+from pykomodo.multi_dirs_chunker import ParallelChunker
+from pykomodo.tree_generator import TreeGenerator
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@unittest.skipUnless(shutil.which("git"), "git is not installed")
+class TestGitRefChunking(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        self.out_dir = tempfile.mkdtemp()
+        git(self.repo, "init", "-q")
+        git(self.repo, "config", "user.email", "dev@example.com")
+        git(self.repo, "config", "user.name", "dev")
+        self._write("main.py", "def main():\n    return 1\n")
+        self._write("src/app.py", "x = 1\ny = 2\n")
+        self._write("docs/guide.md", "# Guide\n")
+        self._write("node_modules/pkg/index.js", "module.exports = 1\n")
+        with open(os.path.join(self.repo, "data.bin"), "wb") as f:
+            f.write(b"\x00\x01binary")
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "first")
+        git(self.repo, "tag", "v1")
+        self._write("main.py", "def main():\n    return 2\n")
+        self._write("new.py", "z = 3\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo)
+        shutil.rmtree(self.out_dir)
+
+    def _write(self, rel, text):
+        path = os.path.join(self.repo, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def _output(self):
+        text = ""
+        for name in sorted(os.listdir(self.out_dir)):
+            with open(os.path.join(self.out_dir, name)) as f:
+                text += f.read()
+        return text
+
+    def test_chunks_ref_contents_not_work_tree(self):
+        ParallelChunker(max_chunk_size=50, output_dir=self.out_dir).process_git_ref(self.repo, "v1")
+        text = self._output()
+        self.assertIn("return 1", text)
+        self.assertNotIn("return 2", text)
+        self.assertNotIn("new.py", text)
+        self.assertNotIn("module.exports", text)
+        self.assertNotIn("binary", text)
+        self.assertIn(os.path.join(self.repo, "src", "app.py"), text)
+
+    def test_matches_checkout_output(self):
+        git(self.repo, "stash", "-u", "-q")
+        expected_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, expected_dir)
+        ParallelChunker(max_chunk_size=1, output_dir=expected_dir).process_directory(self.repo)
+        ParallelChunker(max_chunk_size=1, output_dir=self.out_dir).process_git_ref(self.repo, "HEAD")
+        expected = {}
+        for name in os.listdir(expected_dir):
+            with open(os.path.join(expected_dir, name)) as f:
+                expected[name] = f.read()
+        actual = {}
+        for name in os.listdir(self.out_dir):
+            with open(os.path.join(self.out_dir, name)) as f:
+                actual[name] = f.read()
+        self.assertEqual(actual, expected)
+
+    def test_ignore_files_come_from_the_ref(self):
+        self._write(".pykomodo-ignore", "docs/\n")
+        git(self.repo, "add", ".pykomodo-ignore")
+        git(self.repo, "commit", "-q", "-m", "ignore docs")
+        ParallelChunker(max_chunk_size=50, output_dir=self.out_dir).process_git_ref(self.repo, "v1")
+        self.assertIn("# Guide", self._output())
+        shutil.rmtree(self.out_dir)
+        self._write(".pykomodo-ignore", "")
+        ParallelChunker(max_chunk_size=50, output_dir=self.out_dir).process_git_ref(self.repo, "HEAD")
+        self.assertNotIn("# Guide", self._output())
+        self.assertIn("src", self._output())
+
+    def test_blobs_respect_the_byte_budget(self):
+        chunker = ParallelChunker(max_chunk_size=50, output_dir=self.out_dir, max_inflight_bytes=20)
+        objects = CatFileBatch(self.repo)
+        self.addCleanup(objects.close)
+        selected = chunker._select_entries(self.repo, objects, list_tree(self.repo, "v1"))
+        with CatFileBatch(self.repo) as reader:
+            items = {os.path.relpath(item.path, self.repo): item
+                     for item in chunker._iter_blobs(reader, objects, selected)}
+        self.assertFalse(items["main.py"].is_resident)
+        self.assertTrue(items[os.path.join("src", "app.py")].is_resident)
+        self.assertEqual(chunker._byte_budget.used, 20)
+        for item in items.values():
+            item.release()
+        self.assertEqual(chunker._byte_budget.used, 0)
+        with patch("subprocess.run", side_effect=AssertionError("one git process per blob")):
+            self.assertEqual(items["main.py"].content, b"def main():\n    return 1\n")
+        self.assertEqual(items[os.path.join("src", "app.py")].content, b"x = 1\ny = 2\n")
+        chunker = ParallelChunker(equal_chunks=2, output_dir=self.out_dir, max_inflight_bytes=20)
+        chunker.process_git_ref(self.repo, "v1")
+        self.assertIn("return 1", self._output())
+        self.assertNotIn("return 2", self._output())
+
+    def test_bare_repository(self):
+        bare = tempfile.mkdtemp(suffix=".git")
+        self.addCleanup(shutil.rmtree, bare)
+        git(self.repo, "clone", "-q", "--bare", self.repo, bare)
+        chunker = ParallelChunker(max_chunk_size=50, output_dir=self.out_dir, file_type="py")
+        chunker.process_git_ref(bare, "v1")
+        text = self._output()
+        self.assertIn("return 1", text)
+        self.assertNotIn("# Guide", text)
+
+    def test_unknown_ref_raises(self):
+        chunker = ParallelChunker(max_chunk_size=50, output_dir=self.out_dir)
+        with self.assertRaises(ValueError):
+            chunker.process_git_ref(self.repo, "no-such-tag")
+        with self.assertRaises(ValueError):
+            chunker.process_git_ref(self.repo, "--all")
+
+    def test_cat_file_batch_reads_blobs(self):
+        entries = {e.path: e for e in list_tree(self.repo, "v1")}
+        with CatFileBatch(self.repo) as reader:
+            blobs = dict(reader.iter_blobs([entries["src/app.py"].sha, "0" * 40]))
+            self.assertEqual(blobs[entries["src/app.py"].sha], b"x = 1\ny = 2\n")
+            self.assertIsNone(blobs["0" * 40])
+            self.assertEqual(reader.read(entries["main.py"].sha), b"def main():\n    return 1\n")
+
+    def test_tree_from_paths_matches_directory_tree(self):
+        git(self.repo, "stash", "-u", "-q")
+        generator = TreeGenerator()
+        paths = [e.path for e in list_tree(self.repo, "HEAD")]
+        self.assertEqual(generator.generate_tree_from_paths(self.repo, paths),
+                         generator.generate_tree_structure(self.repo))
+
+
+@unittest.skipUnless(shutil.which("git"), "git is not installed")
+class TestGitDiffChunking(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        self.out_dir = tempfile.mkdtemp()
+        git(self.repo, "init", "-q")
+        git(self.repo, "config", "user.email", "dev@example.com")
+        git(self.repo, "config", "user.name", "dev")
+        self._write("keep.py", "a = 1\n")
+        self._write("edit.txt", "".join(f"line {i}\n" for i in range(1, 41)))
+        self._write("gone.txt", "bye\n")
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "base")
+        lines = [f"line {i}\n" for i in range(1, 41)]
+        lines[19] = "changed 20\n"
+        self._write("edit.txt", "".join(lines))
+        self._write("added.md", "# new\n")
+        self._write("skipped.log", "noise\n")
+        os.remove(os.path.join(self.repo, "gone.txt"))
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "change")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo)
+        shutil.rmtree(self.out_dir)
+
+    def _write(self, rel, text):
+        with open(os.path.join(self.repo, rel), "w") as f:
+            f.write(text)
+
+    def _output(self):
+        text = ""
+        for name in sorted(os.listdir(self.out_dir)):
+            with open(os.path.join(self.out_dir, name)) as f:
+                text += f.read()
+        return text
+
+    def _files(self):
+        return sorted(line[6:] for line in self._output().splitlines() if line.startswith("File: "))
+
+    def test_diff_between_revisions(self):
+        chunker = ParallelChunker(max_chunk_size=100, output_dir=self.out_dir, user_ignore=["*.log"])
+        chunker.process_git_diff(self.repo, "HEAD~1", "HEAD")
+        self.assertEqual(self._files(), [os.path.join(self.repo, "added.md"),
+                                         os.path.join(self.repo, "edit.txt")])
+
+    def test_since_reads_working_tree(self):
+        self._write("keep.py", "a = 2\n")
+        chunker = ParallelChunker(max_chunk_size=100, output_dir=self.out_dir)
+        chunker.process_git_diff(self.repo, "HEAD")
+        self.assertEqual(self._files(), [os.path.join(self.repo, "keep.py")])
+        self.assertIn("a = 2", self._output())
+
+    def test_hunks_keep_context_lines(self):
+        chunker = ParallelChunker(max_chunk_size=100, output_dir=self.out_dir)
+        chunker.process_git_diff(self.repo, "HEAD~1", "HEAD", hunk_context=2)
+        text = self._output()
+        self.assertIn("@@ lines 18-22 @@\nline 18\nline 19\nchanged 20\nline 21\nline 22\n", text)
+        self.assertNotIn("line 17", text)
+        self.assertIn("# new", text)
+
+    def test_hunks_for_names_with_spaces(self):
+        os.mkdir(os.path.join(self.repo, "sub"))
+        self._write("sub/my file.txt", "one\ntwo\n")
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "spaced")
+        self._write("sub/my file.txt", "one\nTWO\n")
+        self.assertEqual(changed_ranges(self.repo, "HEAD", None, 0), {"sub/my file.txt": [(2, 1)]})
+        chunker = ParallelChunker(max_chunk_size=100, output_dir=self.out_dir)
+        chunker.process_git_diff(self.repo, "HEAD", hunk_context=0)
+        self.assertIn("@@ lines 2-2 @@\nTWO\n", self._output())
+
+    def test_deletion_only_hunks_are_reported(self):
+        lines = [f"line {i}\n" for i in range(1, 41)]
+        lines[19] = "changed 20\n"
+        del lines[29:31]
+        self._write("edit.txt", "".join(lines))
+        self.assertEqual(changed_ranges(self.repo, "HEAD", None, 0)["edit.txt"], [(29, 0)])
+        chunker = ParallelChunker(max_chunk_size=100, output_dir=self.out_dir)
+        chunker.process_git_diff(self.repo, "HEAD", hunk_context=0)
+        self.assertIn("@@ lines removed after line 29 @@", self._output())
+
+    def test_diff_honours_ignore_files(self):
+        self._write(".pykomodo-ignore", "*.md\n*.log\n")
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "ignore md")
+        chunker = ParallelChunker(max_chunk_size=100, output_dir=self.out_dir)
+        chunker.process_git_diff(self.repo, "HEAD~2", "HEAD")
+        self.assertEqual(self._files(), [os.path.join(self.repo, ".pykomodo-ignore"),
+                                         os.path.join(self.repo, "edit.txt")])
+        shutil.rmtree(self.out_dir)
+        self._write("added.md", "# newer\n")
+        ParallelChunker(max_chunk_size=100, output_dir=self.out_dir).process_git_diff(self.repo, "HEAD~2")
+        self.assertNotIn("# newer", self._output())
+
+    def test_changed_ranges_and_range_spec(self):
+        self.assertEqual(changed_ranges(self.repo, "HEAD~1", "HEAD", 0)["edit.txt"], [(20, 1)])
+        self.assertEqual(resolve_range(self.repo, "HEAD~1.."), ("HEAD~1", "HEAD"))
+        with self.assertRaises(ValueError):
+            resolve_range(self.repo, "HEAD~1")
+
+
+if __name__ == "__main__":
+    unittest.main()
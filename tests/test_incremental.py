@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from pykomodo.manifest import MANIFEST_FILENAME, Manifest
+from pykomodo.multi_dirs_chunker import ParallelChunker
+from pykomodo.watcher import InotifyWatcher
+
+
+class TestIncrementalChunking(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.out_dir = tempfile.mkdtemp()
+        self._write("a.txt", "alpha\n" * 30)
+        self._write("b.txt", "bravo\n" * 5)
+        self._write("c.txt", "charlie\n" * 12)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        shutil.rmtree(self.out_dir)
+
+    def _write(self, name, text):
+        path = os.path.join(self.test_dir, name)
+        with open(path, "w") as f:
+            f.write(text)
+        old = time.time() - 60
+        os.utime(path, (old, old))
+
+    def _run(self, **kwargs):
+        chunker = ParallelChunker(max_chunk_size=10, output_dir=self.out_dir,
+                                  incremental=True, **kwargs)
+        chunker.process_directory(self.test_dir)
+        return chunker
+
+    def _chunks(self):
+        out = {}
+        for name in os.listdir(self.out_dir):
+            if name.startswith("chunk-"):
+                with open(os.path.join(self.out_dir, name)) as f:
+                    out[name] = f.read()
+        return out
+
+    def _owned(self, name):
+        manifest = Manifest.load(self.out_dir)
+        return manifest.files[os.path.join(self.test_dir, name)]["chunks"]
+
+    def test_first_run_matches_full_run(self):
+        with open(os.path.join(self.test_dir, "0.dat"), "wb") as f:
+            f.write(b"\x00binary")
+        full_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, full_dir)
+        ParallelChunker(max_chunk_size=10, output_dir=full_dir).process_directory(self.test_dir)
+        self._run()
+        expected = {}
+        for name in os.listdir(full_dir):
+            with open(os.path.join(full_dir, name)) as f:
+                expected[name] = f.read()
+        self.assertEqual(self._chunks(), expected)
+        self.assertTrue(os.path.exists(os.path.join(self.out_dir, MANIFEST_FILENAME)))
+
+    def test_unchanged_tree_rewrites_nothing(self):
+        self._run()
+        before = self._chunks()
+        chunker = ParallelChunker(max_chunk_size=10, output_dir=self.out_dir, incremental=True)
+        written = []
+        chunker._write_chunk = lambda data, num: written.append(num)
+        chunker.process_directory(self.test_dir)
+        self.assertEqual(written, [])
+        self.assertEqual(self._chunks(), before)
+
+    def test_changed_file_keeps_other_chunk_ids(self):
+        self._run()
+        before = self._chunks()
+        a_ids, c_ids = self._owned("a.txt"), self._owned("c.txt")
+        self._write("b.txt", "bravo\n" * 25)
+        self._run()
+        after = self._chunks()
+        self.assertEqual((self._owned("a.txt"), self._owned("c.txt")), (a_ids, c_ids))
+        for chunk_id in a_ids + c_ids:
+            name = f"chunk-{chunk_id}.txt"
+            self.assertEqual(after[name], before[name])
+        self.assertEqual(len(self._owned("b.txt")), 3)
+        self.assertEqual(len(after), len(a_ids) + len(c_ids) + 3)
+
+    def test_removed_file_chunks_are_deleted(self):
+        self._run()
+        c_ids = self._owned("c.txt")
+        os.remove(os.path.join(self.test_dir, "c.txt"))
+        self._run()
+        chunks = self._chunks()
+        for chunk_id in c_ids:
+            self.assertNotIn(f"chunk-{chunk_id}.txt", chunks)
+        self.assertNotIn(os.path.join(self.test_dir, "c.txt"), Manifest.load(self.out_dir).files)
+        self.assertNotIn("c.txt", chunks["chunk-0.txt"])
+
+    def test_chunk_zero_moves_when_fresh_files_remain(self):
+        for name, text in (("a.txt", "alpha\n" * 30), ("b.txt", "bravo\n" * 5), ("c.txt", "charlie\n" * 12)):
+            with open(os.path.join(self.test_dir, name), "w") as f:
+                f.write(text)
+        self._run()
+        self.assertEqual(Manifest.load(self.out_dir).owner_of(0), os.path.join(self.test_dir, "a.txt"))
+        os.remove(os.path.join(self.test_dir, "a.txt"))
+        self._run()
+        chunks = self._chunks()
+        self.assertIn("chunk-0.txt", chunks)
+        self.assertIn("PROJECT STRUCTURE", chunks["chunk-0.txt"])
+        self.assertNotIn("a.txt", chunks["chunk-0.txt"])
+
+    def test_added_file_refreshes_tree_header(self):
+        self._run()
+        self._write("d.txt", "delta")
+        self._run()
+        self.assertIn("d.txt", self._chunks()["chunk-0.txt"])
+
+    def test_config_change_rebuilds(self):
+        self._run()
+        self._run(semantic_chunking=True)
+        manifest = Manifest.load(self.out_dir)
+        self.assertEqual(sorted(manifest.chunk_ids()), list(range(len(self._chunks()))))
+
+    def test_export_rows_are_merged(self):
+        self._run(export_jsonl=True)
+        self._write("b.txt", "bravo\n" * 25)
+        self._run(export_jsonl=True)
+        with open(os.path.join(self.out_dir, "chunks.jsonl")) as f:
+            nums = [json.loads(line)["metadata"]["chunk_num"] for line in f]
+        self.assertEqual(nums, sorted(int(n[6:-4]) for n in self._chunks()))
+
+    def test_equal_chunks_rejected(self):
+        with self.assertRaises(ValueError):
+            ParallelChunker(equal_chunks=2, incremental=True)
+
+    def test_targeted_update_matches_full_pass(self):
+        self._run()
+        self._write("b.txt", "bravo\n" * 25)
+        self._write("d.txt", "delta\n")
+        os.remove(os.path.join(self.test_dir, "c.txt"))
+        changed = [os.path.join(self.test_dir, name) for name in ("b.txt", "c.txt", "d.txt", "e.swp")]
+        with open(os.path.join(self.test_dir, ".gitignore"), "w") as f:
+            f.write("*.swp\n")
+        self._write("e.swp", "swap")
+        chunker = ParallelChunker(max_chunk_size=10, output_dir=self.out_dir, incremental=True)
+        chunker._process_incremental([self.test_dir], changed)
+        targeted = (self._chunks(), Manifest.load(self.out_dir).files)
+        self.assertNotIn(os.path.join(self.test_dir, "e.swp"), targeted[1])
+        shutil.rmtree(self.out_dir)
+        os.mkdir(self.out_dir)
+        self._run()
+        self.assertEqual(set(targeted[1]), set(Manifest.load(self.out_dir).files) - {os.path.join(self.test_dir, ".gitignore")})
+
+    def _watch_until(self, use_inotify, condition):
+        chunker = ParallelChunker(max_chunk_size=10, output_dir=self.out_dir)
+        stop = threading.Event()
+        thread = threading.Thread(target=chunker.watch, args=([self.test_dir],),
+                                  kwargs={"debounce": 0.05, "poll_interval": 0.05,
+                                          "stop_event": stop, "use_inotify": use_inotify})
+        thread.start()
+        try:
+            deadline = time.time() + 10
+            while Manifest.load(self.out_dir) is None and time.time() < deadline:
+                time.sleep(0.02)
+            before = self._owned("a.txt")
+            with open(os.path.join(self.test_dir, "b.txt"), "a") as f:
+                f.write("bravo\n" * 20)
+            while not condition() and time.time() < deadline:
+                time.sleep(0.02)
+            self.assertTrue(condition())
+            self.assertEqual(self._owned("a.txt"), before)
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_watch_with_polling(self):
+        self._watch_until(False, lambda: len(self._owned("b.txt")) == 3)
+
+    @unittest.skipUnless(hasattr(os, "uname") and os.uname().sysname == "Linux", "inotify is Linux-only")
+    def test_watch_with_inotify(self):
+        watcher = InotifyWatcher()
+        watcher.close()
+        self._watch_until(True, lambda: len(self._owned("b.txt")) == 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from pykomodo.command_line import main, read_path_list
+from pykomodo.multi_dirs_chunker import ParallelChunker
+
+
+class TestPathList(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.out_dir = tempfile.mkdtemp()
+        for rel in ("a.py", "b.txt", "skip.txt", os.path.join("pkg", "c.py")):
+            path = os.path.join(self.test_dir, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(f"contents of {rel}\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        shutil.rmtree(self.out_dir)
+
+    def _path(self, rel):
+        return os.path.join(self.test_dir, rel)
+
+    def _output(self):
+        text = ""
+        for name in sorted(os.listdir(self.out_dir)):
+            with open(os.path.join(self.out_dir, name)) as f:
+                text += f.read()
+        return text
+
+    def test_process_paths_only_chunks_listed_files(self):
+        chunker = ParallelChunker(max_chunk_size=50, output_dir=self.out_dir)
+        listed = iter([self._path("a.py"), self._path(os.path.join("pkg", "c.py")),
+                       self._path("a.py"), self._path("missing.py")])
+        chunker.process_paths(listed, root=self.test_dir)
+        text = self._output()
+        self.assertIn("contents of a.py", text)
+        self.assertIn("contents of " + os.path.join("pkg", "c.py"), text)
+        self.assertNotIn("contents of b.txt", text)
+        self.assertEqual(text.count("contents of a.py"), 1)
+
+    def test_tree_header_lists_only_given_paths(self):
+        chunker = ParallelChunker(max_chunk_size=50, output_dir=self.out_dir, stream=True)
+        chunker.process_paths([self._path("b.txt"), self._path(os.path.join("pkg", "c.py"))],
+                              root=self.test_dir)
+        with open(os.path.join(self.out_dir, "chunk-0.txt")) as f:
+            header = f.read().split("=" * 80)[2]
+        self.assertIn("pkg/\n│   └── c.py", header)
+        self.assertIn("└── b.txt", header)
+        self.assertNotIn("a.py", header)
+
+    def test_ignore_patterns_and_file_type_apply(self):
+        chunker = ParallelChunker(max_chunk_size=50, output_dir=self.out_dir,
+                                  user_ignore=["skip.txt"], file_type="txt")
+        chunker.process_paths([self._path(n) for n in ("a.py", "b.txt", "skip.txt")],
+                              root=self.test_dir)
+        text = self._output()
+        self.assertIn("contents of b.txt", text)
+        self.assertNotIn("contents of a.py", text)
+        self.assertNotIn("contents of skip.txt", text)
+
+    def test_forced_paths_skip_ignore_patterns(self):
+        build = self._path(os.path.join("build", "gen.txt"))
+        os.makedirs(os.path.dirname(build))
+        with open(build, "w") as f:
+            f.write("generated\n")
+        listed = [build, self._path("skip.txt")]
+        chunker = ParallelChunker(max_chunk_size=50, output_dir=self.out_dir, user_ignore=["skip.txt"])
+        self.assertEqual(chunker.process_paths(listed, root=self.test_dir), 0)
+        self.assertEqual(chunker.process_paths(listed, root=self.test_dir, force_process=True), 2)
+        text = self._output()
+        self.assertIn("generated", text)
+        self.assertIn("contents of skip.txt", text)
+
+    def test_ignore_files_apply_unless_forced(self):
+        with open(self._path(".gitignore"), "w") as f:
+            f.write("b.txt\n")
+        with open(self._path(os.path.join("pkg", ".pykomodo-ignore")), "w") as f:
+            f.write("*.md\n")
+        with open(self._path(os.path.join("pkg", "notes.md")), "w") as f:
+            f.write("contents of notes\n")
+        listed = [self._path(n) for n in ("a.py", "b.txt", os.path.join("pkg", "notes.md"))]
+        chunker = ParallelChunker(max_chunk_size=50, output_dir=self.out_dir)
+        self.assertEqual(chunker.process_paths(listed, root=self.test_dir), 1)
+        self.assertNotIn("contents of b.txt", self._output())
+        self.assertEqual(chunker.process_paths(listed, root=self.test_dir, force_process=True), 3)
+        self.assertIn("contents of notes", self._output())
+
+    def test_read_path_list_separators(self):
+        self.assertEqual(list(read_path_list(io.BytesIO(b"a.py\r\nb c.txt\n\nd"), 4)),
+                         ["a.py", "b c.txt", "d"])
+        self.assertEqual(list(read_path_list(io.BytesIO(b"a\nb.py\0c.py\0"))),
+                         ["a\nb.py", "c.py"])
+
+    def test_paths_from_cli(self):
+        list_file = os.path.join(self.out_dir, "paths.txt")
+        with open(list_file, "wb") as f:
+            f.write(b"\0".join(os.fsencode(self._path(n)) for n in ("a.py", "b.txt")))
+        chunk_dir = os.path.join(self.out_dir, "chunks")
+        argv = ["komodo", self.test_dir, "--paths-from", list_file,
+                "--max-chunk-size", "50", "--output-dir", chunk_dir]
+        with patch.object(sys, "argv", argv):
+            main()
+        text = ""
+        for name in os.listdir(chunk_dir):
+            with open(os.path.join(chunk_dir, name)) as f:
+                text += f.read()
+        self.assertIn("contents of b.txt", text)
+        self.assertNotIn("contents of skip.txt", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
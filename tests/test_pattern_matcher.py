@@ -0,0 +1,182 @@
+import fnmatch
+import itertools
+import os
+import tempfile
+import unittest
+
+from pykomodo.multi_dirs_chunker import BUILTIN_IGNORES, ParallelChunker, PriorityRule
+from pykomodo.pattern_matcher import (
+    IgnoreFileRules,
+    IgnoreMatcher,
+    PatternSet,
+    PriorityMatcher,
+    is_absolute_pattern,
+    parse_ignore_line,
+    parse_pattern_line,
+)
+
+
+def _match_segments(path_segs, pattern_segs, pi=0, pj=0):
+    if pj == len(pattern_segs):
+        return pi == len(path_segs)
+    if pi == len(path_segs):
+        return all(seg == "**" for seg in pattern_segs[pj:])
+    if pattern_segs[pj] == "**":
+        return (_match_segments(path_segs, pattern_segs, pi, pj + 1)
+                or _match_segments(path_segs, pattern_segs, pi + 1, pj))
+    if fnmatch.fnmatch(path_segs[pi], pattern_segs[pj]):
+        return _match_segments(path_segs, pattern_segs, pi + 1, pj + 1)
+    return False
+
+
+def reference_match(abs_path, rel_path, pattern):
+    target = abs_path if is_absolute_pattern(pattern) else rel_path
+    if "**" in pattern:
+        if _match_segments(target.replace("\\", "/").split("/"), pattern.replace("\\", "/").split("/")):
+            return True
+    elif fnmatch.fnmatch(target, pattern):
+        return True
+    if not is_absolute_pattern(pattern) and "/" not in pattern:
+        if fnmatch.fnmatch(os.path.basename(abs_path), pattern):
+            return True
+    return False
+
+
+EXTRA_PATTERNS = [
+    "*.py", "*", "?", "a*", "*a*b*", "[ab]", "[!a]*", "a/b", "a/*", "**",
+    "**/a", "**/a/**", "**/*.txt", "**/a/**/b", "/proj/**", "/proj/*",
+    "x**", "**x.py", "*/x.py", "a/**/*.py", "**/[ab]/**", "*.p[yo]", "a?c*",
+]
+
+SEGMENTS = ["a", "b", "node_modules", "x.py", "y.pyc", "build", "foo.egg-info",
+            "c.txt", ".env", "Thumbs.db", "tmp", "a.b.c"]
+
+
+class TestPatternSet(unittest.TestCase):
+    def _paths(self):
+        for depth in (1, 2, 3):
+            for segs in itertools.product(SEGMENTS, repeat=depth):
+                rel = "/".join(segs)
+                yield "/proj/" + rel, rel
+
+    def test_each_pattern_matches_reference(self):
+        for pattern in BUILTIN_IGNORES + EXTRA_PATTERNS:
+            compiled = PatternSet([pattern])
+            for abs_path, rel_path in self._paths():
+                self.assertEqual(
+                    compiled.match(abs_path, rel_path),
+                    reference_match(abs_path, rel_path, pattern),
+                    f"{pattern!r} vs {rel_path!r}",
+                )
+
+    def test_combined_set_matches_any_pattern(self):
+        patterns = BUILTIN_IGNORES + EXTRA_PATTERNS
+        compiled = PatternSet(patterns)
+        for abs_path, rel_path in self._paths():
+            expected = any(reference_match(abs_path, rel_path, p) for p in patterns)
+            self.assertEqual(compiled.match(abs_path, rel_path), expected, rel_path)
+
+    def test_basename_only(self):
+        compiled = PatternSet(["*.py", "Makefile", "te?t_*"], basename_only=True)
+        self.assertTrue(compiled.match("/proj/src/mod.py", "src/mod.py"))
+        self.assertTrue(compiled.match("/proj/Makefile", "Makefile"))
+        self.assertTrue(compiled.match("/proj/tests/test_a.txt", "tests/test_a.txt"))
+        self.assertFalse(compiled.match("/proj/py/readme", "py/readme"))
+
+    def test_ignore_matcher_unignore(self):
+        matcher = IgnoreMatcher(["**/node_modules/**"], ["*.py"])
+        self.assertTrue(matcher.should_ignore("/p/node_modules/a.js", "node_modules/a.js"))
+        self.assertFalse(matcher.should_ignore("/p/node_modules/a.py", "node_modules/a.py"))
+        self.assertFalse(matcher.should_ignore("/p/src/a.js", "src/a.js"))
+
+
+class TestDirectoryIgnore(unittest.TestCase):
+    def test_directory_context_matches_full_paths(self):
+        ignore = BUILTIN_IGNORES + ["**/a/**/b", "/proj/b/**", "a/*", "*a*b*"]
+        unignore = ["*.py", "**/build/**/*.txt"]
+        matcher = IgnoreMatcher(ignore, unignore)
+        root = matcher.directory("/proj")
+        for depth in (1, 2, 3):
+            for segs in itertools.product(SEGMENTS, repeat=depth):
+                context = root
+                for seg in segs[:-1]:
+                    context = context.child(seg)
+                rel = "/".join(segs)
+                self.assertEqual(
+                    context.should_ignore(segs[-1]),
+                    matcher.should_ignore("/proj/" + rel, rel),
+                    rel,
+                )
+
+    def test_subtree_patterns_settle_files(self):
+        matcher = IgnoreMatcher(["**/generated/**"], [])
+        context = matcher.directory("/proj").child("generated").child("deep")
+        self.assertTrue(context.settled)
+        self.assertEqual(context.checks_avoided, 1)
+
+        matcher = IgnoreMatcher(["**/generated/**", "*.log"], ["**/keep/**"])
+        self.assertFalse(matcher.directory("/proj").child("keep").settled)
+        self.assertIsNone(matcher.directory("/proj").child("src").settled)
+
+    def test_collect_paths_reports_stats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "src"))
+            for name in ("a.txt", "b.txt", "c.log"):
+                with open(os.path.join(tmp, "src", name), "w") as f:
+                    f.write("x")
+            chunker = ParallelChunker(max_chunk_size=100, user_ignore=["*.log"],
+                                      output_dir=os.path.join(tmp, "out"))
+            paths = chunker._collect_paths([tmp])
+            self.assertEqual(sorted(os.path.basename(p) for p in paths), ["a.txt", "b.txt"])
+            self.assertEqual(chunker.ignore_stats["entries"], 4)
+            self.assertGreater(chunker.ignore_stats["pattern_checks_avoided"], 0)
+
+
+class TestIgnoreFileRules(unittest.TestCase):
+    def test_parse_ignore_line(self):
+        self.assertIsNone(parse_ignore_line("# comment\n"))
+        self.assertIsNone(parse_ignore_line("   \n"))
+        self.assertEqual(parse_ignore_line("*.log\n"), (False, False, "**/*.log"))
+        self.assertEqual(parse_ignore_line("!keep.log"), (True, False, "**/keep.log"))
+        self.assertEqual(parse_ignore_line("/build/"), (False, True, "build"))
+        self.assertEqual(parse_ignore_line("docs/*.md  "), (False, False, "docs/*.md"))
+        self.assertEqual(parse_ignore_line("\\#notes"), (False, False, "**/#notes"))
+
+    def test_last_matching_rule_wins(self):
+        rules = IgnoreFileRules.from_lines(["*.log", "!keep.log", "out/", "a/**"], prefix="pkg/")
+        self.assertTrue(rules.match("pkg/x/debug.log"))
+        self.assertFalse(rules.match("pkg/keep.log"))
+        self.assertTrue(rules.match("pkg/deep/out", is_dir=True))
+        self.assertIsNone(rules.match("pkg/deep/out"))
+        self.assertTrue(rules.match("pkg/a/b.txt"))
+        self.assertIsNone(rules.match("pkg/a"))
+        self.assertIsNone(rules.match("pkg/src/main.py"))
+
+    def test_pykomodo_ignore_lines_use_fnmatch(self):
+        self.assertIsNone(parse_pattern_line("  # comment\n"))
+        self.assertEqual(parse_pattern_line(" build/ \n"), "**/build/**")
+        self.assertEqual(parse_pattern_line("docs/api/"), "docs/api/**")
+        rules = IgnoreFileRules.from_lines([], prefix="pkg/", pattern_lines=["docs/*", "*.log", "!keep.log"])
+        self.assertTrue(rules)
+        self.assertTrue(rules.match_patterns("/p/pkg/docs/a/b.md", "pkg/docs/a/b.md"))
+        self.assertTrue(rules.match_patterns("/p/pkg/x/keep.log", "pkg/x/keep.log"))
+        self.assertFalse(rules.match_patterns("/p/pkg/src/docs", "pkg/src/docs"))
+        self.assertIsNone(rules.match("pkg/x/keep.log"))
+
+
+class TestPriorityMatcher(unittest.TestCase):
+    def test_highest_matching_score_wins(self):
+        matcher = PriorityMatcher([("*.py", 10), ("main*", 20), ("*", -5)])
+        self.assertEqual(matcher.priority("/p/src/main.py"), 20)
+        self.assertEqual(matcher.priority("/p/src/util.py"), 10)
+        self.assertEqual(matcher.priority("/p/README.md"), 0)
+
+    def test_chunker_uses_current_rules(self):
+        chunker = ParallelChunker(max_chunk_size=100, priority_rules=[("*.txt", 5)])
+        self.assertEqual(chunker.calculate_priority("notes.txt"), 5)
+        chunker.priority_rules.append(PriorityRule("notes*", 50))
+        self.assertEqual(chunker.calculate_priority("notes.txt"), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
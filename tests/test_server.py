@@ -199,6 +199,28 @@ class TestServer(unittest.TestCase):
         self.assertFalse(data['success'])
         self.assertIn('No files selected', data['error'])
 
+    def test_api_process_files_keeps_selected_ignored_files(self):
+        env_file = os.path.join(self.test_dir, ".env")
+        with open(env_file, "w") as f:
+            f.write("DEBUG=1\n")
+        image = os.path.join(self.test_dir, "logo.png")
+        with open(image, "wb") as f:
+            f.write(b"\x89PNG\x00\x00")
+        output_dir = os.path.join(self.test_dir, "output")
+        payload = {'files': [env_file], 'strategy': 'size', 'chunkSize': 100, 'outputDir': output_dir}
+        response = self.app.post('/api/process-files', data=json.dumps(payload),
+                                 content_type='application/json')
+        data = json.loads(response.data)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['chunks'], 1)
+
+        payload['files'] = [image]
+        response = self.app.post('/api/process-files', data=json.dumps(payload),
+                                 content_type='application/json')
+        data = json.loads(response.data)
+        self.assertFalse(data['success'])
+        self.assertIn('No files could be processed', data['error'])
+
     def test_api_process_files_defaults(self):
         with patch('pykomodo.server.ParallelChunker') as mock_chunker:
             mock_instance = MagicMock()
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import tiktoken
+
+from pykomodo.token_cache import TokenCache, token_key
+from pykomodo.token_chunker import TokenBasedChunker
+from test_tokenization import SAMPLE, local_encoding
+
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        for i in range(3):
+            with open(os.path.join(self.test_dir, f"mod{i}.py"), "w", encoding="utf-8") as f:
+                f.write(SAMPLE * (20 + i))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        shutil.rmtree(self.cache_dir)
+
+    def _run(self, **kwargs):
+        out_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, out_dir)
+        with TokenBasedChunker(output_dir=out_dir, token_cache_dir=self.cache_dir, **kwargs) as chunker:
+            chunker.encoding = local_encoding()
+            chunker.process_directory(self.test_dir)
+            outputs = {}
+            for name in sorted(os.listdir(out_dir)):
+                with open(os.path.join(out_dir, name), encoding="utf-8") as f:
+                    outputs[name] = f.read()
+            return chunker, outputs
+
+    def _assert_warm_run_skips_tokenizer(self, **kwargs):
+        first, expected = self._run(**kwargs)
+        self.assertEqual(first.token_cache.misses, 3)
+        with mock.patch.object(tiktoken.Encoding, "encode_ordinary_batch") as batch, \
+                mock.patch.object(tiktoken.Encoding, "encode_ordinary") as single:
+            second, outputs = self._run(**kwargs)
+        batch.assert_not_called()
+        single.assert_not_called()
+        self.assertEqual(second.token_cache.hits, 3)
+        self.assertEqual(outputs, expected)
+
+    def test_line_planner_reuses_offsets(self):
+        self._assert_warm_run_skips_tokenizer(max_tokens_per_chunk=80)
+
+    def test_equal_chunks_reuse_counts(self):
+        self._assert_warm_run_skips_tokenizer(equal_chunks=2)
+
+    def test_count_tokens_is_cached(self):
+        with TokenBasedChunker(max_tokens_per_chunk=80, token_cache_dir=self.cache_dir) as chunker:
+            chunker.encoding = local_encoding()
+            text = SAMPLE * 20
+            count = chunker.count_tokens(text)
+            self.assertEqual(chunker.count_tokens(text), count)
+            self.assertEqual((chunker.token_cache.hits, chunker.token_cache.misses), (1, 1))
+            chunker.count_tokens(SAMPLE)
+            self.assertEqual(chunker.token_cache.misses, 1)
+
+    def test_offsets_round_trip_and_eviction(self):
+        cache = TokenCache(self.cache_dir, max_bytes=1000)
+        self.addCleanup(cache.close)
+        keys = [token_key(f"{i:032x}", "test-local") for i in range(4)]
+        self.assertNotEqual(keys[0], token_key(f"{0:032x}", "other"))
+        cache.put(keys[0], 5, [0, 2, 5])
+        tokens, offsets = cache.get(keys[0], offsets=True)
+        self.assertEqual((tokens, list(offsets)), (5, [0, 2, 5]))
+        self.assertEqual(offsets.typecode, "I")
+        cache.put(keys[1], 7)
+        self.assertIsNone(cache.get(keys[1], offsets=True))
+        self.assertEqual(cache.get(keys[1]), (7, None))
+        for key in keys[2:]:
+            cache.put(key, 9, list(range(0, 900, 3)))
+        cache.get(keys[3])
+        self.assertLessEqual(cache._total, 1000)
+        self.assertIsNotNone(cache.get(keys[3]))
+        self.assertIsNone(cache.get(keys[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -364,5 +364,25 @@ class TestTokenBasedChunker:
             assert "syntax_error.py" in content
             assert "This has a syntax error" in content
 
+    def test_mapped_large_files_match_in_memory(self, test_dir, sample_files):
+        """Test that mmap-backed reading produces the same chunks."""
+        with open(os.path.join(test_dir, "dump.sql"), "wb") as f:
+            f.write(b"insert into t values (1, 'caf\xc3\xa9');\r\n\n" * 50)
+        outputs = []
+        for threshold in (1, 1 << 40):
+            out_dir = tempfile.mkdtemp()
+            try:
+                chunker = TokenBasedChunker(max_tokens_per_chunk=30, output_dir=out_dir,
+                                            mmap_threshold=threshold)
+                chunker.process_directory(test_dir)
+                chunks = {}
+                for name in os.listdir(out_dir):
+                    with open(os.path.join(out_dir, name), encoding="utf-8") as f:
+                        chunks[name] = f.read()
+                outputs.append(chunks)
+            finally:
+                shutil.rmtree(out_dir)
+        assert outputs[0] == outputs[1]
+
 if __name__ == "__main__":
-    pytest.main(["-v", __file__])
\ No newline at end of file
+    pytest.main(["-v", __file__])
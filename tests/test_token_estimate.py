@@ -0,0 +1,102 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from pykomodo.command_line import main
+from pykomodo.token_chunker import TokenBasedChunker
+from pykomodo.token_estimate import TokenEstimator, byte_class_counts
+from test_tokenization import SAMPLE, local_encoding
+
+
+class TestTokenEstimate(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.out_dir = tempfile.mkdtemp()
+        for i in range(8):
+            with open(os.path.join(self.test_dir, f"mod{i}.py"), "w", encoding="utf-8") as f:
+                f.write(SAMPLE.replace("komodo", "komodo" * i))
+        with open(os.path.join(self.test_dir, "big.py"), "w", encoding="utf-8") as f:
+            f.write(SAMPLE * 20)
+        with open(os.path.join(self.test_dir, "notes.md"), "w", encoding="utf-8") as f:
+            f.write("word " * 200 + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        shutil.rmtree(self.out_dir)
+
+    def test_byte_class_counts(self):
+        self.assertEqual(byte_class_counts("ab 12\n+é".encode("utf-8")), [2, 2, 1, 1, 1, 2])
+
+    def _assert_bodies_within(self, encoding, budget):
+        bodies = []
+        for name in os.listdir(self.out_dir):
+            with open(os.path.join(self.out_dir, name), encoding="utf-8") as f:
+                body = f.read().split("\n" + "=" * 40 + "\n", 2)[-1]
+            if body.startswith("[Long line"):
+                body = body.split("\n", 1)[1].rstrip("\n")
+            self.assertLessEqual(len(encoding.encode_ordinary(body)), budget)
+            bodies.append(body)
+        return bodies
+
+    def test_small_files_skip_tokenization(self):
+        chunker = TokenBasedChunker(max_tokens_per_chunk=300, output_dir=self.out_dir, fit_by_bytes=True)
+        chunker.encoding = local_encoding()
+        with patch.object(chunker, "_exact_line_counts", wraps=chunker._exact_line_counts) as exact:
+            chunker.process_directory(self.test_dir)
+        self.assertEqual(chunker.unread_files, 8)
+        self.assertEqual(chunker.estimate_stats, {"sampled_files": 0, "estimated_files": 0})
+        self.assertEqual(sum(len(call.args[0]) for call in exact.call_args_list), 2)
+        bodies = self._assert_bodies_within(chunker.encoding, 300)
+        self.assertGreaterEqual(sum("class Config" in body for body in bodies), 9)
+
+    def test_mismatched_files_stay_within_budget(self):
+        shutil.rmtree(self.test_dir)
+        os.mkdir(self.test_dir)
+        for i in range(3):
+            with open(os.path.join(self.test_dir, f"a{i}.txt"), "w", encoding="utf-8") as f:
+                f.write(SAMPLE)
+        rng = random.Random(7)
+        words = ("".join(rng.choice("bcdfghjklmnpqrstvwxz") for _ in range(5)) for _ in range(38))
+        with open(os.path.join(self.test_dir, "b.txt"), "w", encoding="utf-8") as f:
+            f.write(" ".join(words) + "\n")
+        encoding = local_encoding()
+        with open(os.path.join(self.test_dir, "b.txt"), encoding="utf-8") as f:
+            self.assertGreater(len(encoding.encode_ordinary(f.read())), 200)
+        chunker = TokenBasedChunker(max_tokens_per_chunk=200, output_dir=self.out_dir, fit_by_bytes=True)
+        chunker.encoding = encoding
+        chunker.process_directory(self.test_dir)
+        self.assertGreaterEqual(len(self._assert_bodies_within(encoding, 200)), 5)
+        self.assertEqual(chunker.unread_files, 3)
+
+    def test_equal_chunks_use_estimates(self):
+        chunker = TokenBasedChunker(equal_chunks=2, output_dir=self.out_dir, estimate_tokens=True)
+        chunker.encoding = local_encoding()
+        chunker.process_directory(self.test_dir)
+        self.assertEqual(chunker.estimate_stats["estimated_files"], 6)
+        self.assertEqual(len(os.listdir(self.out_dir)), 2)
+
+    def test_estimator_calibrates_per_extension(self):
+        estimator = TokenEstimator(sample_files=2)
+        estimator.add_sample(".txt", 0, 0)
+        estimator.add_sample(".txt", 40.0, 30)
+        self.assertFalse(estimator.calibrated(".txt"))
+        self.assertEqual(estimator.samples_needed(".txt"), 1)
+        estimator.add_sample(".txt", 20.0, 30)
+        self.assertTrue(estimator.calibrated(".txt"))
+        self.assertEqual(estimator.estimate(".txt", 10.0), 10.0)
+
+    def test_cli_requires_max_tokens(self):
+        for flags in (["--max-chunk-size", "50", "--fit-by-bytes"],
+                      ["--max-tokens", "50", "--estimate-tokens"]):
+            argv = ["komodo", self.test_dir] + flags
+            with patch.object(sys, "argv", argv), patch("sys.stderr"):
+                with self.assertRaises(SystemExit):
+                    main()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import base64
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import tiktoken
+from tiktoken.load import load_tiktoken_bpe
+
+from pykomodo import token_chunker, tokenization
+from pykomodo.token_chunker import TokenBasedChunker
+from pykomodo.tokenization import line_token_counts, load_encoding, word_token_counts
+
+PAT = (r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*"""
+       r"""|\s*[\r\n]|\s+(?!\S)|\s+""")
+
+SAMPLE = """def main(argv):
+    total = 0
+    for item in argv:
+        total += len(item)
+
+    return total  # café
+
+
+class Config:
+    name = "komodo"
+"""
+
+
+def local_encoding():
+    ranks = {bytes([i]): i for i in range(256)}
+    for word in (b"def", b" main", b"    ", b" total", b" =", b"return", b"class", b" item", b"\n\n"):
+        for end in range(2, len(word) + 1):
+            ranks.setdefault(word[:end], len(ranks))
+    return tiktoken.Encoding(name="test-local", pat_str=PAT, mergeable_ranks=ranks, special_tokens={})
+
+
+class TestTokenization(unittest.TestCase):
+    def setUp(self):
+        self.encoding = local_encoding()
+
+    def test_line_counts_come_from_one_encoding(self):
+        lines = SAMPLE.splitlines()
+        counts = line_token_counts(self.encoding, lines)
+        self.assertEqual(sum(counts), len(self.encoding.encode_ordinary(SAMPLE)))
+        for line, count in zip(lines, counts):
+            if line.strip():
+                self.assertEqual(count, len(self.encoding.encode_ordinary(line + "\n")))
+
+    def test_word_counts_cover_the_line(self):
+        line = "alpha  beta\tcafé <|endoftext|> gamma"
+        words, counts = word_token_counts(self.encoding, line)
+        self.assertEqual(words, line.split())
+        self.assertEqual(sum(counts), len(self.encoding.encode_ordinary(line)))
+
+
+class TestTokenChunkerBudgets(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.test_dir, "sample.py"), "w", encoding="utf-8") as f:
+            f.write(SAMPLE * 40 + "word " * 400 + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _run(self, **kwargs):
+        out_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, out_dir)
+        chunker = TokenBasedChunker(max_tokens_per_chunk=60, output_dir=out_dir, **kwargs)
+        chunker.encoding = local_encoding()
+        chunker.process_directory(self.test_dir)
+        chunks = {}
+        for name in os.listdir(out_dir):
+            with open(os.path.join(out_dir, name), encoding="utf-8") as f:
+                chunks[name] = f.read()
+        return chunker.encoding, chunks
+
+    def test_line_chunks_respect_token_budget(self):
+        encoding, chunks = self._run()
+        self.assertGreater(len(chunks), 5)
+        for text in chunks.values():
+            body = text.split("\n" + "=" * 40 + "\n", 2)[-1]
+            if body.startswith("[Long line"):
+                body = body.split("\n", 1)[1].rstrip("\n")
+            self.assertLessEqual(len(encoding.encode_ordinary(body)), 60)
+
+    def test_batched_counting_matches_per_file_batches(self):
+        for i in range(3):
+            with open(os.path.join(self.test_dir, f"extra{i}.txt"), "w", encoding="utf-8") as f:
+                f.write(SAMPLE * (i + 2))
+        with patch.object(tiktoken.Encoding, "encode_ordinary_batch", autospec=True,
+                          side_effect=tiktoken.Encoding.encode_ordinary_batch) as batch:
+            _, together = self._run(token_threads=3)
+        self.assertEqual(len(batch.call_args_list), 1)
+        self.assertEqual(len(batch.call_args.args[1]), 4)
+        self.assertEqual(batch.call_args.kwargs["num_threads"], 3)
+        with patch.object(token_chunker, "TOKEN_BATCH_BYTES", 1):
+            _, apart = self._run()
+        self.assertEqual(apart, together)
+
+    def test_process_executor_matches_threads(self):
+        _, threaded = self._run()
+        _, processed = self._run(executor="process", num_threads=2)
+        self.assertEqual(processed, threaded)
+
+    def test_mapped_batches_match_whole_file(self):
+        _, whole = self._run()
+        with patch.object(token_chunker, "TOKEN_BATCH_LINES", 7):
+            _, mapped = self._run(mmap_threshold=1)
+        self.assertEqual(mapped, whole)
+
+
+class TestTokenizerBootstrap(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        cache = patch.dict(tokenization._encodings, clear=True)
+        cache.start()
+        self.addCleanup(cache.stop)
+
+    def test_encoding_loads_lazily_once_per_process(self):
+        with patch("tiktoken.get_encoding", return_value=local_encoding()) as get_encoding:
+            first = TokenBasedChunker(max_tokens_per_chunk=60, output_dir=self.tmp_dir, dry_run=True)
+            second = TokenBasedChunker(max_tokens_per_chunk=60, output_dir=self.tmp_dir)
+            get_encoding.assert_not_called()
+            self.assertIs(first.encoding, second.encoding)
+        get_encoding.assert_called_once_with("cl100k_base")
+
+    def test_rank_file_loads_without_touching_the_environment(self):
+        ranks = os.path.join(self.tmp_dir, "test-local.tiktoken")
+        with open(ranks, "wb") as f:
+            for token, rank in local_encoding()._mergeable_ranks.items():
+                f.write(base64.b64encode(token) + b" %d\n" % rank)
+
+        def constructor():
+            return {"name": "test-local", "pat_str": PAT, "special_tokens": {},
+                    "mergeable_ranks": load_tiktoken_bpe("https://example.invalid/test-local.tiktoken")}
+
+        constructors = {"test-local": constructor}
+        with patch.object(tokenization, "ENCODING_CONSTRUCTORS", constructors), \
+                patch("tiktoken.get_encoding", side_effect=AssertionError("no download")), \
+                patch.dict(os.environ, {"TIKTOKEN_CACHE_DIR": ""}):
+            encoding = load_encoding("test-local", self.tmp_dir)
+            self.assertEqual(os.environ["TIKTOKEN_CACHE_DIR"], "")
+        self.assertEqual(encoding.encode_ordinary(SAMPLE), local_encoding().encode_ordinary(SAMPLE))
+        with self.assertRaises(ValueError):
+            load_encoding("no-such-encoding", ranks)
+
+    def test_rank_file_must_match_the_published_hash(self):
+        ranks = os.path.join(self.tmp_dir, "cl100k_base.tiktoken")
+        with open(ranks, "wb") as f:
+            f.write(b"YQ== 0\n")
+        cache_dir = os.path.join(self.tmp_dir, "cache")
+        with patch.dict(os.environ, {"TIKTOKEN_CACHE_DIR": cache_dir}), self.assertRaises(ValueError):
+            load_encoding("cl100k_base", ranks)
+
+    def test_unloadable_tokenizer(self):
+        chunker = TokenBasedChunker(max_tokens_per_chunk=60, output_dir=self.tmp_dir,
+                                    tokenizer_path=os.path.join(self.tmp_dir, "missing"))
+        with self.assertRaises(ValueError):
+            chunker.encoding
+        with patch("tiktoken.get_encoding", side_effect=ValueError("offline")):
+            chunker = TokenBasedChunker(max_tokens_per_chunk=60, output_dir=self.tmp_dir)
+            with self.assertRaises(ValueError):
+                chunker.encoding
+            chunker = TokenBasedChunker(max_tokens_per_chunk=60, output_dir=self.tmp_dir,
+                                        word_count_fallback=True)
+            with patch("builtins.print"):
+                self.assertIsNone(chunker.encoding)
+            self.assertEqual(chunker.count_tokens("two words"), 2)
+
+if __name__ == "__main__":
+    unittest.main()
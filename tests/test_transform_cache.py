@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from pykomodo.multi_dirs_chunker import ParallelChunker
+import re
+
+from pykomodo import loader, redaction
+from pykomodo.redaction import REDACTED_LINE, KeyPrefixDetector, SecretRedactor
+from pykomodo.transform_cache import TransformCache, transform_key
+
+
+class TestTransformCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.out_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.test_dir, "app.py"), "w") as f:
+            f.write('x = 1\nAPI_KEY = "sk-abc123def456ghi789jkl"\ny = 2\n')
+        with open(os.path.join(self.test_dir, "notes.txt"), "w") as f:
+            f.write("nothing secret here\r\nsecond line\n")
+
+    def tearDown(self):
+        for d in (self.test_dir, self.cache_dir, self.out_dir):
+            shutil.rmtree(d, ignore_errors=True)
+
+    def _run(self):
+        with ParallelChunker(max_chunk_size=1000, output_dir=self.out_dir,
+                             transform_cache_dir=self.cache_dir) as chunker:
+            chunker.process_directory(self.test_dir)
+            outputs = {}
+            for name in sorted(os.listdir(self.out_dir)):
+                with open(os.path.join(self.out_dir, name)) as f:
+                    outputs[name] = f.read()
+            return chunker, outputs
+
+    def test_unchanged_files_skip_redaction(self):
+        first, expected = self._run()
+        self.assertEqual(first.redaction_count, 1)
+        self.assertEqual(first.transform_cache.misses, 2)
+        with mock.patch.object(SecretRedactor, "redact_text") as redact:
+            second, outputs = self._run()
+        redact.assert_not_called()
+        self.assertEqual(second.transform_cache.hits, 2)
+        self.assertEqual(second.redaction_count, 1)
+        self.assertEqual(outputs, expected)
+        self.assertIn(REDACTED_LINE, "".join(outputs.values()))
+
+    def test_changed_content_or_config_misses(self):
+        self._run()
+        with open(os.path.join(self.test_dir, "notes.txt"), "a") as f:
+            f.write("third line\n")
+        chunker, _ = self._run()
+        self.assertEqual((chunker.transform_cache.hits, chunker.transform_cache.misses), (1, 1))
+        redactor = SecretRedactor()
+        self.assertNotEqual(redactor.fingerprint("a.py"), redactor.fingerprint("a.env"))
+        self.assertNotEqual(redactor.fingerprint("a.py"),
+                            SecretRedactor(default=("key_prefix",)).fingerprint("a.py"))
+
+    def test_fingerprint_covers_full_patterns(self):
+        redactor = SecretRedactor(default=("key_prefix",))
+        base = redactor.fingerprint("a.py")
+        tail = redaction.KEY_PREFIXES.pattern[:-1] + "|zz_[0-9]{40})"
+        patched = KeyPrefixDetector(re.compile(tail))
+        with mock.patch.dict(redaction.DETECTORS, {"key_prefix": patched}):
+            self.assertNotEqual(SecretRedactor(default=("key_prefix",)).fingerprint("a.py"), base)
+        with mock.patch.object(redaction, "QUOTED_VALUE", re.compile(r"=\s*'x'")):
+            self.assertNotEqual(SecretRedactor(default=("key_prefix",)).fingerprint("a.py"), base)
+        with mock.patch.object(redaction, "REDACTION_VERSION", "test"):
+            self.assertNotEqual(SecretRedactor(default=("key_prefix",)).fingerprint("a.py"), base)
+
+    def test_loaded_hash_is_reused(self):
+        with mock.patch("pykomodo.multi_dirs_chunker.content_hash",
+                        wraps=loader.content_hash) as digest:
+            self._run()
+        self.assertEqual(digest.call_count, 2)
+
+    def test_lru_eviction(self):
+        cache = TransformCache(self.cache_dir, max_bytes=1000)
+        self.addCleanup(cache.close)
+        keys = [transform_key(f"{i:032x}", "fp") for i in range(4)]
+        for key in keys[:3]:
+            cache.put(key, os.urandom(200).hex(), 1)
+        cache.get(keys[0])
+        for key in keys[3:]:
+            cache.put(key, os.urandom(200).hex(), 1)
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[3]))
+        self.assertLessEqual(cache._total, 1000)
+
+    def test_clean_files_store_only_a_flag(self):
+        cache = TransformCache(self.cache_dir)
+        self.addCleanup(cache.close)
+        key = transform_key("0" * 32, "fp")
+        cache.put(key, None, 0)
+        self.assertEqual(cache.get(key), (None, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()